@@ -42,8 +42,8 @@ export default function CidadaoDashboardPage() {
 
         setUser(currentUser)
 
-        const { solicitacoes } = await getSolicitacoes()
-        setMinhasSolicitacoes(solicitacoes.slice(0, 5))
+        const { solicitacoes } = await getSolicitacoes({ page_size: 5, include_total: false })
+        setMinhasSolicitacoes(solicitacoes)
       } catch (error) {
         console.error("Error loading dashboard:", error)
       } finally {
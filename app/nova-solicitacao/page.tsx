@@ -81,7 +81,11 @@ export default function NovaSolicitacaoPage() {
 
       const result = await createSolicitacao(data)
 
-      alert("Solicitação enviada com sucesso!")
+      alert(
+        result.duplicada
+          ? "Já existe uma solicitação aberta para esse problema nesse local. Seu relato foi registrado como apoio a ela."
+          : "Solicitação enviada com sucesso!",
+      )
       router.push("/dashboard")
     } catch (error: any) {
       if (error.message.includes("token") || error.message.includes("expired") || error.message.includes("Invalid")) {
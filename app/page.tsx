@@ -77,7 +77,7 @@ export default function HomePage() {
       },
     ]
 
-    Promise.all([getCategorias(), getBairros(), getRecentSolicitacoes(5), getVereadoresStats(), getSolicitacoes({})])
+    Promise.all([getCategorias(), getBairros(), getRecentSolicitacoes(5), getVereadoresStats(), getSolicitacoes({ page_size: 200, include_total: false })])
       .then(([categoriasRes, bairrosRes, recentRes, statsRes, allSolicitacoesRes]) => {
         console.log("[v0] Homepage - Loaded stats:", statsRes)
         setCategorias(categoriasRes.categorias)
@@ -119,7 +119,8 @@ export default function HomePage() {
       if (category && category !== "Todas") filters.categoria = category
       if (neighborhood && neighborhood !== "Todos") filters.bairro = neighborhood
 
-      const result = await getSolicitacoes(filters)
+      // Only the count is shown
+      const result = await getSolicitacoes({ ...filters, page_size: 1, fields: ["id"] })
       console.log("[v0] Search results:", result)
       alert(`Encontradas ${result.total} solicitações`)
     } catch (error) {
@@ -6,7 +6,7 @@ import { useRouter } from "next/navigation"
 import { Button } from "@/components/ui/button"
 import { Bell, TrendingUp, Clock, CheckCircle2, AlertCircle, MapPin, LogOut } from "lucide-react"
 import { getCurrentUser, logout } from "@/lib/auth"
-import { getSolicitacoes, updateSolicitacao, type Solicitacao } from "@/lib/api"
+import { getAllSolicitacoes, updateSolicitacao, type Solicitacao } from "@/lib/api"
 
 export default function VereadorDashboardPage() {
   const router = useRouter()
@@ -32,10 +32,10 @@ export default function VereadorDashboardPage() {
 
         setUser(currentUser)
 
-        const { solicitacoes: novas } = await getSolicitacoes({ status: "aberta" })
+        const novas = await getAllSolicitacoes({ status: "aberta" })
         setNovasSolicitacoes(novas.filter((s) => !s.vereador_id))
 
-        const { solicitacoes: minhas } = await getSolicitacoes({ vereador_id: currentUser.vereador_id })
+        const minhas = await getAllSolicitacoes({ vereador_id: currentUser.vereador_id })
         setMinhasSolicitacoes(minhas)
       } catch (error) {
         console.error("Error loading dashboard:", error)
@@ -59,10 +59,10 @@ export default function VereadorDashboardPage() {
         status: "em_andamento",
       })
 
-      const { solicitacoes: novas } = await getSolicitacoes({ status: "aberta" })
+      const novas = await getAllSolicitacoes({ status: "aberta" })
       setNovasSolicitacoes(novas.filter((s) => !s.vereador_id))
 
-      const { solicitacoes: minhas } = await getSolicitacoes({ vereador_id: user.vereador_id })
+      const minhas = await getAllSolicitacoes({ vereador_id: user.vereador_id })
       setMinhasSolicitacoes(minhas)
     } catch (error) {
       console.error("Error assuming solicitação:", error)
@@ -268,7 +268,7 @@ export default function VereadorDashboardPage() {
                             className="flex-1 bg-transparent"
                             onClick={async () => {
                               await updateSolicitacao(solicitacao.id, { status: "resolvida" })
-                              const { solicitacoes: minhas } = await getSolicitacoes({ vereador_id: user.vereador_id })
+                              const minhas = await getAllSolicitacoes({ vereador_id: user.vereador_id })
                               setMinhasSolicitacoes(minhas)
                             }}
                           >
@@ -0,0 +1,246 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import AnalyticsBucket, Solicitacao
+from ranking import previous_value
+from reference_data import reference_data
+
+TEMPO_BINS = AnalyticsBucket.TEMPO_BINS
+HISTOGRAM = tuple(f'tempo_{bound}' for bound in TEMPO_BINS)
+METRICS = ('abertas', 'resolvidas', 'tempo_resolucao_total', 'tempo_resolucao_count') + HISTOGRAM
+INTERVALS = ('dia', 'semana', 'mes')
+DIMENSIONS = {
+    'bairro': AnalyticsBucket.bairro_id,
+    'categoria': AnalyticsBucket.categoria_id
+}
+
+
+def tempo_column(tempo):
+    return HISTOGRAM[bisect_right(TEMPO_BINS, tempo) - 1]
+
+
+def analytics_snapshot(created_at, bairro_id, categoria_id, status, tempo_resolucao):
+    """The bucket increments one solicitacao accounts for, as ((dia, bairro_id, categoria_id), {metric: n}) pairs."""
+    if created_at is None or categoria_id is None:
+        return ()
+    dia = created_at.date() if hasattr(created_at, 'date') else created_at
+    bairro_id, categoria_id = int(bairro_id or 0), int(categoria_id)
+    increments = [((dia, bairro_id, categoria_id), {'abertas': 1})]
+    if status == 'resolvida':
+        resolvida = {'resolvidas': 1}
+        if tempo_resolucao is not None:
+            # A negative value (bad data) would index the histogram from its end
+            tempo_resolucao = max(0, tempo_resolucao)
+            resolvida.update({
+                'tempo_resolucao_total': tempo_resolucao,
+                'tempo_resolucao_count': 1,
+                tempo_column(tempo_resolucao): 1
+            })
+        # No resolution timestamp is stored; creation day + tempo_resolucao is the day it was resolved
+        increments.append(((dia + timedelta(days=tempo_resolucao or 0), bairro_id, categoria_id), resolvida))
+    return tuple(increments)
+
+
+def _merge(snapshots, delta=1):
+    totals = defaultdict(lambda: defaultdict(int))
+    for snapshot in snapshots:
+        for key, values in snapshot:
+            for metric, value in values.items():
+                totals[key][metric] += value * delta
+    return totals
+
+
+def _apply(connection, totals):
+    table = AnalyticsBucket.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    for (dia, bairro_id, categoria_id), values in totals.items():
+        changed = [metric for metric in METRICS if values.get(metric)]
+        if not changed:
+            continue
+        insert = dialect.insert(table).values(
+            dia=dia, bairro_id=bairro_id, categoria_id=categoria_id,
+            **{metric: values.get(metric, 0) for metric in METRICS}
+        )
+        # Relative upsert, so concurrent writers add up instead of overwriting each other
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=['dia', 'bairro_id', 'categoria_id'],
+            set_={metric: table.c[metric] + insert.excluded[metric] for metric in changed}
+        ))
+
+
+def add_analytics(rows):
+    """Count bulk-inserted rows, which bypass the mapper hooks below."""
+    _apply(db.session.connection(), _merge(
+        analytics_snapshot(
+            row.get('created_at'), row.get('bairro_id'), row.get('categoria_id'),
+            row.get('status'), row.get('tempo_resolucao')
+        ) for row in rows
+    ))
+
+
+def _snapshot(target, value=getattr):
+    return analytics_snapshot(*(
+        value(target, name) for name in ('created_at', 'bairro_id', 'categoria_id', 'status', 'tempo_resolucao')
+    ))
+
+
+@db.event.listens_for(Solicitacao, 'after_insert')
+def _count_insert(mapper, connection, target):
+    _apply(connection, _merge([_snapshot(target)]))
+
+
+@db.event.listens_for(Solicitacao, 'after_update')
+def _count_update(mapper, connection, target):
+    before, after = _snapshot(target, previous_value), _snapshot(target)
+    if before != after:
+        totals = _merge([before], -1)
+        for key, values in _merge([after]).items():
+            for metric, value in values.items():
+                totals[key][metric] += value
+        _apply(connection, totals)
+
+
+@db.event.listens_for(Solicitacao, 'after_delete')
+def _count_delete(mapper, connection, target):
+    _apply(connection, _merge([_snapshot(target)], -1))
+
+
+def _as_date(value):
+    # SQLite returns date() as text
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def rebuild_analytics():
+    """Recompute every bucket from solicitacoes: two grouped scans, folded into day buckets here."""
+    AnalyticsBucket.query.delete()
+    dia = db.func.date(Solicitacao.created_at)
+    count = db.func.count(Solicitacao.id)
+    totals = defaultdict(lambda: defaultdict(int))
+    for created, bairro_id, categoria_id, total in db.session.query(
+        dia, Solicitacao.bairro_id, Solicitacao.categoria_id, count
+    ).group_by(dia, Solicitacao.bairro_id, Solicitacao.categoria_id):
+        totals[(_as_date(created), int(bairro_id or 0), int(categoria_id))]['abertas'] += total
+    for created, bairro_id, categoria_id, tempo, total in db.session.query(
+        dia, Solicitacao.bairro_id, Solicitacao.categoria_id, Solicitacao.tempo_resolucao, count
+    ).filter(
+        Solicitacao.status == 'resolvida'
+    ).group_by(dia, Solicitacao.bairro_id, Solicitacao.categoria_id, Solicitacao.tempo_resolucao):
+        key, values = analytics_snapshot(_as_date(created), bairro_id, categoria_id, 'resolvida', tempo)[1]
+        for metric, value in values.items():
+            totals[key][metric] += value * total
+    if totals:
+        db.session.execute(db.insert(AnalyticsBucket), [
+            {'dia': dia, 'bairro_id': bairro_id, 'categoria_id': categoria_id,
+             **{metric: values.get(metric, 0) for metric in METRICS}}
+            for (dia, bairro_id, categoria_id), values in totals.items()
+        ])
+    db.session.commit()
+    return len(totals)
+
+
+def period_start(dia, interval):
+    if interval == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if interval == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def _next_period(start, interval):
+    if interval == 'semana':
+        return start + timedelta(days=7)
+    if interval == 'mes':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def periods(start, end, interval):
+    current = period_start(start, interval)
+    while current <= end:
+        yield current
+        current = _next_period(current, interval)
+
+
+def percentile(histogram, fraction):
+    """tempo_resolucao at `fraction` from histogram counts; interpolated inside bins wider than a day."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            low = TEMPO_BINS[index]
+            if index + 1 == len(TEMPO_BINS) or TEMPO_BINS[index + 1] - low == 1:
+                return low
+            return round(low + (TEMPO_BINS[index + 1] - low) * (rank - seen) / count, 1)
+        seen += count
+    return TEMPO_BINS[-1]
+
+
+def _period_expression(interval):
+    """SQL for the first day of the period each bucket falls in, matching period_start()."""
+    dia = AnalyticsBucket.dia
+    if interval == 'dia':
+        return dia
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.func.date_trunc('week' if interval == 'semana' else 'month', dia), db.Date)
+    if interval == 'semana':
+        # Next Sunday (or the day itself), then back to that week's Monday
+        return db.func.date(dia, 'weekday 0', '-6 days')
+    return db.func.strftime('%Y-%m-01', dia)
+
+
+def _point(start, values):
+    totals = dict(zip(METRICS, values))
+    histogram = [totals[name] for name in HISTOGRAM]
+    return {
+        'periodo': start.isoformat(),
+        'abertas': totals['abertas'],
+        'resolvidas': totals['resolvidas'],
+        'tempo_medio': round(totals['tempo_resolucao_total'] / totals['tempo_resolucao_count'], 1)
+        if totals['tempo_resolucao_count'] else None,
+        'tempo_p50': percentile(histogram, 0.5),
+        'tempo_p90': percentile(histogram, 0.9)
+    }
+
+
+def timeseries(start, end, interval='semana', group_by=(), bairro=None, categoria=None):
+    """Opened/resolved counts and resolution times per period (and per group_by dimension), zero-filled."""
+    period = _period_expression(interval)
+    columns = [DIMENSIONS[dimension] for dimension in group_by]
+    query = db.session.query(
+        period, *columns, *(db.func.sum(getattr(AnalyticsBucket, metric)) for metric in METRICS)
+    ).filter(
+        AnalyticsBucket.dia >= start, AnalyticsBucket.dia <= end
+    ).group_by(period, *columns)
+    if bairro:
+        query = query.filter(AnalyticsBucket.bairro_id == (reference_data.bairro_id(bairro) or -1))
+    if categoria:
+        query = query.filter(AnalyticsBucket.categoria_id == (reference_data.categoria_id(categoria) or -1))
+
+    groups = defaultdict(dict)
+    for row in query:
+        keys, values = tuple(row[1:1 + len(columns)]), row[1 + len(columns):]
+        groups[keys][_as_date(row[0])] = [value or 0 for value in values]
+    if not group_by:
+        groups.setdefault((), {})
+
+    names = {
+        'bairro': {row['id']: row['nome'] for row in reference_data.rows('bairros')[0]},
+        'categoria': {row['id']: row['nome'] for row in reference_data.rows('categorias')[0]}
+    }
+    empty = [0] * len(METRICS)
+    series = []
+    for keys, buckets in sorted(groups.items()):
+        entry = {}
+        for dimension, id in zip(group_by, keys):
+            entry[f'{dimension}_id'] = id or None
+            entry[dimension] = names[dimension].get(id)
+        entry['pontos'] = [_point(period, buckets.get(period, empty)) for period in periods(start, end, interval)]
+        series.append(entry)
+    return series
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+
+import click
+from flask import request, jsonify
+from http_cache import data_version, not_modified, cacheable
+from analytics import DIMENSIONS, INTERVALS, periods, rebuild_analytics, timeseries
+
+def _parse_date(value, default):
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid date: {value} (expected YYYY-MM-DD)')
+
+def register_analytics_routes(app):
+    @app.route('/api/analytics/timeseries', methods=['GET'])
+    def get_analytics_timeseries():
+        try:
+            interval = request.args.get('interval', 'semana')
+            if interval not in INTERVALS:
+                return jsonify({'error': f'interval must be one of {", ".join(INTERVALS)}'}), 400
+            group_by = [name for name in request.args.get('group_by', '').split(',') if name]
+            unknown = [name for name in group_by if name not in DIMENSIONS]
+            if unknown:
+                return jsonify({'error': f'Cannot group by {", ".join(unknown)}'}), 400
+            
+            today = datetime.utcnow().date()
+            end = _parse_date(request.args.get('to'), today)
+            start = _parse_date(request.args.get('from'), end - timedelta(days=app.config['ANALYTICS_DEFAULT_DAYS']))
+            if start > end:
+                return jsonify({'error': 'from must not be after to'}), 400
+            if sum(1 for _ in periods(start, end, interval)) > app.config['ANALYTICS_MAX_PERIODS']:
+                return jsonify({'error': 'Too many periods; use a longer interval or a shorter range'}), 400
+            
+            # The default range ends today, so the day is part of the version
+            etag, last_modified = data_version()
+            etag = f'{etag}-{today.isoformat()}'
+            unchanged = not_modified(etag, last_modified)
+            if unchanged:
+                return unchanged
+            
+            series = timeseries(
+                start, end, interval, group_by,
+                bairro=request.args.get('bairro'), categoria=request.args.get('categoria')
+            )
+            
+            return cacheable(jsonify({
+                'interval': interval,
+                'from': start.isoformat(),
+                'to': end.isoformat(),
+                'group_by': group_by,
+                'series': series
+            }), etag, last_modified), 200
+            
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.cli.command('rebuild-analytics')
+    def rebuild_analytics_command():
+        """Recompute the analytics buckets from solicitacoes."""
+        click.echo(f'{rebuild_analytics()} bucket(s) rebuilt')
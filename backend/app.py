@@ -1,41 +1,95 @@
 from flask import Flask
 from flask_cors import CORS
-from datetime import timedelta
+from flask_migrate import upgrade
+from sqlalchemy import event
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 
-from extensions import db, bcrypt, jwt
+from config import Config, engine_options
+from extensions import db, jwt, migrate, passwords
+from search import init_search
+from instrumentation import configure_logging, init_instrumentation
+from replicas import REPLICA_BIND, STICKY_HEADER, init_replica_routing
+from serialization import FastJSONProvider
 
-app = Flask(__name__)
-CORS(app)
 
+def _enable_sqlite_wal(dbapi_connection, connection_record):
+    # WAL lets readers run while a writer holds the lock
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///cidadao_ativo.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-in-production'
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=7)
-app.config['UPLOAD_FOLDER'] = 'uploads'
 
-db.init_app(app)
-bcrypt.init_app(app)
-jwt.init_app(app)
+def create_app(config=None):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    CORS(app, expose_headers=[STICKY_HEADER])
 
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    if app.config['DATABASE_REPLICA_URL']:
+        replica_url = app.config['DATABASE_REPLICA_URL']
+        app.config.setdefault('SQLALCHEMY_BINDS', {
+            REPLICA_BIND: {'url': replica_url, **engine_options(app.config, replica_url)}
+        })
+    configure_logging(app)
+    if app.config['TRUSTED_PROXIES']:
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    db.init_app(app)
+    jwt.init_app(app)
+    passwords.init_app(app)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(__file__), 'migrations'))
+    init_search(app)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite' and db.engine.url.database not in (None, '', ':memory:'):
+            event.listen(db.engine, 'connect', _enable_sqlite_wal)
+
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    from auth_routes import register_auth_routes
+    from solicitacao_routes import register_solicitacao_routes
+    from vereador_routes import register_vereador_routes
+    from bulk_routes import register_bulk_routes
+    from change_routes import register_change_routes
+    from query_plans import register_query_plan_command
+    from job_routes import register_job_routes
+    from analytics_routes import register_analytics_routes
+    from snapshot_routes import register_snapshot_routes
+
+    register_auth_routes(app)
+    register_solicitacao_routes(app)
+    register_vereador_routes(app)
+    register_bulk_routes(app)
+    register_change_routes(app)
+    register_query_plan_command(app)
+    register_job_routes(app)
+    register_analytics_routes(app)
+    register_snapshot_routes(app)
+    init_instrumentation(app)
+    init_replica_routing(app)
+
+    return app
 
-from auth_routes import register_auth_routes
-from solicitacao_routes import register_solicitacao_routes
-from vereador_routes import register_vereador_routes
 
-register_auth_routes(app)
-register_solicitacao_routes(app)
-register_vereador_routes(app)
+app = create_app()
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        upgrade()
         print("\n" + "="*50)
-        print("✓ Database created successfully!")
+        print("✓ Database migrated successfully!")
         print("✓ Server running at http://127.0.0.1:5000")
         print("✓ Ready to accept connections")
         print("="*50 + "\n")
-    app.run(debug=True, port=5000)
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
+    # Development convenience: process background jobs in this process (skip the reloader's watcher)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        from jobs import start_worker_thread
+        start_worker_thread(app)
+    app.run(debug=debug, port=5000)
@@ -1,9 +1,43 @@
 from flask import request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from extensions import db, bcrypt
-from models import User, Vereador
+from extensions import db, passwords
+from models import Categoria, Solicitacao, User, Vereador
+from rate_limit import TokenBucketLimiter
+from identity import identity_cache, identity_claims
+from cache import TTLCache, clear_on_commit
 
 def register_auth_routes(app):
+    # /me is polled on every page load; a vereador's profile is their stored counters plus one
+    # areas query, kept until the next write that could change it
+    profile_cache = TTLCache(app.config['IDENTITY_CACHE_TTL'])
+    clear_on_commit(profile_cache, Solicitacao, Vereador, Categoria)
+    email_limiter = TokenBucketLimiter(*app.config['LOGIN_RATE_LIMIT_EMAIL'])
+    ip_limiter = TokenBucketLimiter(*app.config['LOGIN_RATE_LIMIT_IP'])
+    
+    def throttled(*keys):
+        # Checked before any bcrypt work so credential stuffing can't burn the CPU
+        retry_after = max(
+            [ip_limiter.consume(f'ip:{request.remote_addr}')] +
+            # Per email and client, so failed attempts from elsewhere can't lock the owner out
+            [email_limiter.consume(f'email:{key.lower()}:{request.remote_addr}') for key in keys]
+        )
+        if retry_after:
+            response = jsonify({'error': 'Too many attempts. Please try again later.'})
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response, 429
+        return None
+    
+    def vereador_profile(vereador_id):
+        cached = profile_cache.get(vereador_id)
+        if cached:
+            return cached[0]
+        vereador = db.session.get(Vereador, vereador_id)
+        if not vereador:
+            return None
+        profile = vereador.to_dict()
+        profile_cache.set(vereador_id, profile)
+        return profile
+    
     @app.route('/api/auth/register', methods=['POST'])
     def register():
         try:
@@ -14,13 +48,18 @@ def register_auth_routes(app):
             for field in required_fields:
                 if not data.get(field):
                     return jsonify({'error': f'{field} is required'}), 400
+                if not isinstance(data[field], str):
+                    return jsonify({'error': f'{field} must be a string'}), 400
             
+            limited = throttled()
+            if limited:
+                return limited
            
             if User.query.filter_by(email=data['email']).first():
                 return jsonify({'error': 'Email already registered'}), 400
             
           
-            password_hash = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+            password_hash = passwords.generate_password_hash(data['password'])
             
        
             new_user = User(
@@ -34,7 +73,10 @@ def register_auth_routes(app):
             db.session.add(new_user)
             db.session.commit()
             
-            access_token = create_access_token(identity=str(new_user.id))
+            access_token = create_access_token(
+                identity=str(new_user.id),
+                additional_claims=identity_claims(new_user.id)
+            )
             
             return jsonify({
                 'message': 'User registered successfully',
@@ -54,21 +96,25 @@ def register_auth_routes(app):
          
             if not data.get('email') or not data.get('password'):
                 return jsonify({'error': 'Email and password are required'}), 400
+            if not isinstance(data['email'], str) or not isinstance(data['password'], str):
+                return jsonify({'error': 'Email and password must be strings'}), 400
             
+            limited = throttled(data['email'])
+            if limited:
+                return limited
         
             user = User.query.filter_by(email=data['email']).first()
             
-            if not user or not bcrypt.check_password_hash(user.password_hash, data['password']):
+            if not user or not passwords.check_password_hash(user.password_hash, data['password']):
                 return jsonify({'error': 'Invalid email or password'}), 401
             
-            access_token = create_access_token(identity=str(user.id))
+            claims = identity_claims(user.id)
+            access_token = create_access_token(identity=str(user.id), additional_claims=claims)
             
             
             user_data = user.to_dict()
-            if user.tipo_usuario == 'vereador':
-                vereador = Vereador.query.filter_by(user_id=user.id).first()
-                if vereador:
-                    user_data['vereador_id'] = vereador.id
+            if claims['vereador_id']:
+                user_data['vereador_id'] = claims['vereador_id']
             
             return jsonify({
                 'message': 'Login successful',
@@ -84,19 +130,19 @@ def register_auth_routes(app):
     def get_current_user():
         try:
             current_user_id = int(get_jwt_identity())
-            user = User.query.get(current_user_id)
+            identity = identity_cache.get(current_user_id)
             
-            if not user:
+            if not identity:
                 return jsonify({'error': 'User not found'}), 404
             
-            user_data = user.to_dict()
+            user_data = dict(identity['user'])
             
            
-            if user.tipo_usuario == 'vereador':
-                vereador = Vereador.query.filter_by(user_id=user.id).first()
-                if vereador:
-                    user_data['vereador_id'] = vereador.id
-                    user_data['vereador_profile'] = vereador.to_dict()
+            if identity['vereador_id']:
+                user_data['vereador_id'] = identity['vereador_id']
+                profile = vereador_profile(identity['vereador_id'])
+                if profile:
+                    user_data['vereador_profile'] = profile
             
             return jsonify({'user': user_data}), 200
             
@@ -0,0 +1,138 @@
+"""Latency and SQL query count per read endpoint, through the Flask test client.
+
+Seed a database at the scale you care about, record a baseline, then compare
+later runs against it. Run from backend/:
+
+    python seed_data.py --solicitacoes 1_000_000 --vereadores 55 --users 200_000
+    python -m benchmarks.endpoint_benchmark --output baseline.json
+    python -m benchmarks.endpoint_benchmark --compare baseline.json   # exits 1 on a regression
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Solicitacao, User, Vereador
+from query_plans import CHECKED_URLS
+
+ENDPOINTS = CHECKED_URLS + [
+    '/api/solicitacoes?page_size=200',
+    '/api/solicitacoes?fields=id,titulo,status',
+    '/api/solicitacoes/clusters?zoom=10',
+    '/api/categorias',
+    '/api/bairros'
+]
+
+
+def measure(client, url, repeat, warmup, queries):
+    for _ in range(warmup):
+        client.get(url)
+    timings, counts = [], []
+    for _ in range(repeat):
+        queries[0] = 0
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        counts.append(queries[0])
+    timings.sort()
+    return {
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'queries': max(counts),
+        'bytes': len(response.data)
+    }
+
+
+def run(endpoints, repeat, warmup):
+    queries = [0]
+    with app.app_context():
+        event.listen(db.engine, 'after_cursor_execute', lambda *args: queries.__setitem__(0, queries[0] + 1))
+        dataset = {
+            'solicitacoes': Solicitacao.query.count(),
+            'users': User.query.count(),
+            'vereadores': Vereador.query.count()
+        }
+        database = db.engine.url.render_as_string(hide_password=True)
+    client = app.test_client()
+    results = {url: measure(client, url, repeat, warmup, queries) for url in endpoints}
+    return {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'database': database,
+            'dataset': dataset,
+            'repeat': repeat,
+            'python': platform.python_version()
+        },
+        'endpoints': results
+    }
+
+
+def regressions(result, baseline, tolerance, min_delta_ms):
+    found = []
+    for url, current in result['endpoints'].items():
+        before = baseline['endpoints'].get(url)
+        if before is None:
+            continue
+        if current['status'] != before['status']:
+            found.append(f"{url}: status {before['status']} -> {current['status']}")
+        if current['queries'] > before['queries']:
+            found.append(f"{url}: {before['queries']} -> {current['queries']} queries")
+        slower = current['p50_ms'] - before['p50_ms']
+        if slower > min_delta_ms and current['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            found.append(f"{url}: p50 {before['p50_ms']} -> {current['p50_ms']} ms")
+    return found
+
+
+def report(result, baseline=None):
+    print(f'{"endpoint":<62} {"status":>6} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8} {"kB":>8} {"vs base":>8}')
+    for url, data in result['endpoints'].items():
+        before = (baseline or {}).get('endpoints', {}).get(url)
+        change = f"{(data['p50_ms'] / before['p50_ms'] - 1) * 100:+.0f}%" if before and before['p50_ms'] else ''
+        print(
+            f"{url[:62]:<62} {data['status']:>6} {data['p50_ms']:>9.2f} {data['p95_ms']:>9.2f} "
+            f"{data['queries']:>8} {data['bytes'] / 1024:>8.1f} {change:>8}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--output', help='Write the results as a JSON baseline')
+    parser.add_argument('--compare', help='Baseline JSON to check this run against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown, as a fraction')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='Ignore slowdowns smaller than this')
+    parser.add_argument('endpoints', nargs='*', default=ENDPOINTS)
+    args = parser.parse_args()
+
+    result = run(args.endpoints, args.repeat, args.warmup)
+    print(f"dataset: {result['meta']['dataset']}, {args.repeat} requests per endpoint")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['meta']['dataset'] != result['meta']['dataset']:
+            print(f"warning: baseline was recorded on {baseline['meta']['dataset']}")
+    report(result, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f'baseline written to {args.output}')
+
+    if baseline:
+        found = regressions(result, baseline, args.tolerance, args.min_delta_ms)
+        for line in found:
+            print(f'REGRESSION {line}')
+        if found:
+            sys.exit(1)
@@ -0,0 +1,68 @@
+"""Measure requests/second against a running backend.
+
+Start the server one way or the other, then run from backend/:
+
+    python app.py                          # dev server (before)
+    gunicorn -c gunicorn.conf.py wsgi:app  # gunicorn workers (after)
+
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --concurrency 32 --duration 15
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = [
+    '/api/solicitacoes',
+    '/api/solicitacoes?status=aberta',
+    '/api/vereadores',
+    '/api/vereadores?ranking=mes'
+]
+
+
+def hammer(url, deadline, latencies, errors, lock):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except Exception:
+            with lock:
+                errors.append(1)
+
+
+def run(base_url, path, concurrency, duration):
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(hammer, base_url + path, deadline, latencies, errors, lock)
+
+    if not latencies:
+        print(f'{path:<36} {"-":>10} {"-":>9} {"-":>9} {len(errors):>7}')
+        return
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f'{path:<36} {len(latencies) / duration:>10.1f} '
+        f'{statistics.median(latencies) * 1000:>9.1f} {p99 * 1000:>9.1f} {len(errors):>7}'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('endpoints', nargs='*', default=ENDPOINTS)
+    args = parser.parse_args()
+
+    print(f'{args.concurrency} concurrent clients, {args.duration:g}s per endpoint')
+    print(f'{"endpoint":<36} {"req/s":>10} {"p50 ms":>9} {"p99 ms":>9} {"errors":>7}')
+    for path in args.endpoints:
+        run(args.url.rstrip('/'), path, args.concurrency, args.duration)
@@ -0,0 +1,87 @@
+"""Login latency under concurrent load, bcrypt inline vs. in the process pool.
+
+Run from backend/:  python -m benchmarks.login_benchmark [--clients 16] [--logins 200]
+
+While the logins run, one more thread keeps calling /api/categorias to show
+how much a login burst slows down unrelated endpoints.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+from extensions import db, passwords
+from models import User
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000
+
+
+def run(workers, clients, logins, rounds):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp, "bench.db")}',
+            'PASSWORD_HASH_WORKERS': workers,
+            'BCRYPT_LOG_ROUNDS': rounds,
+            'LOGIN_RATE_LIMIT_EMAIL': (10 ** 9, 10 ** 9),
+            'LOGIN_RATE_LIMIT_IP': (10 ** 9, 10 ** 9)
+        })
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(
+                email='bench@email.com',
+                password_hash=passwords.generate_password_hash('senha123'),
+                nome='Bench'
+            ))
+            db.session.commit()
+
+        client = app.test_client()
+        login_latencies, other_latencies = [], []
+        done = threading.Event()
+
+        def login(_):
+            start = time.perf_counter()
+            client.post('/api/auth/login', json={'email': 'bench@email.com', 'password': 'senha123'})
+            login_latencies.append(time.perf_counter() - start)
+
+        def other():
+            while not done.is_set():
+                start = time.perf_counter()
+                client.get('/api/categorias')
+                other_latencies.append(time.perf_counter() - start)
+
+        background = threading.Thread(target=other)
+        background.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(login, range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        background.join()
+        with app.app_context():
+            db.engine.dispose()
+
+    label = f'pool x{workers}' if workers else 'inline'
+    print(
+        f'{label:<10} {logins / elapsed:>9.1f} {percentile(login_latencies, 50):>11.1f} '
+        f'{percentile(login_latencies, 99):>11.1f} {percentile(other_latencies, 99):>14.1f}'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    print(f'{args.clients} concurrent clients, {args.logins} logins, bcrypt cost {args.rounds}')
+    print(f'{"mode":<10} {"logins/s":>9} {"login p50":>11} {"login p99":>11} {"other p99 ms":>14}')
+    run(0, args.clients, args.logins, args.rounds)
+    run(args.workers, args.clients, args.logins, args.rounds)
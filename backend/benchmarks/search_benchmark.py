@@ -0,0 +1,77 @@
+"""Compare the old LIKE '%term%' search with the FTS5 index.
+
+Run from backend/:  python -m benchmarks.search_benchmark [100000,1000000]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from search import SQLITE_DDL, SQLITE_REBUILD, search_terms
+
+WORDS = [
+    'buraco', 'rua', 'iluminação', 'poste', 'lâmpada', 'praça', 'esgoto', 'água', 'saúde', 'posto',
+    'escola', 'ônibus', 'ponto', 'calçada', 'árvore', 'lixo', 'coleta', 'segurança', 'semáforo', 'asfalto'
+]
+SEARCHES = ['iluminação', 'iluminacao', 'semaforo', 'arvore lixo', 'posto saude']
+REPEAT = 5
+
+
+def build_database(path, rows):
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE solicitacoes (id INTEGER PRIMARY KEY, titulo TEXT, descricao TEXT, endereco TEXT)'
+    )
+    for ddl in SQLITE_DDL:
+        conn.execute(ddl)
+    batch = []
+    for i in range(1, rows + 1):
+        batch.append((
+            i,
+            ' '.join(rng.choices(WORDS, k=4)),
+            ' '.join(rng.choices(WORDS, k=20)),
+            f'Rua {rng.choice(WORDS)}, {rng.randint(1, 2000)}'
+        ))
+        if len(batch) == 10000:
+            conn.executemany('INSERT INTO solicitacoes VALUES (?, ?, ?, ?)', batch)
+            batch = []
+    conn.executemany('INSERT INTO solicitacoes VALUES (?, ?, ?, ?)', batch)
+    conn.execute(SQLITE_REBUILD)
+    conn.commit()
+    return conn
+
+
+def timed(conn, sql, params):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        count = conn.execute(sql, params).fetchone()[0]
+    return (time.perf_counter() - start) / REPEAT * 1000, count
+
+
+def run(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_database(os.path.join(tmp, 'bench.db'), rows)
+        print(f'\n{rows:,} rows')
+        print(f'{"search":<20} {"like ms":>10} {"rows":>8} {"fts ms":>10} {"rows":>8}')
+        for search in SEARCHES:
+            pattern = f'%{search}%'
+            like_ms, like_rows = timed(
+                conn,
+                'SELECT COUNT(*) FROM solicitacoes WHERE titulo LIKE ? OR descricao LIKE ? OR endereco LIKE ?',
+                (pattern, pattern, pattern)
+            )
+            match = ' '.join(f'"{term}"*' for term in search_terms(search))
+            fts_ms, fts_rows = timed(
+                conn, 'SELECT COUNT(*) FROM solicitacoes_fts WHERE solicitacoes_fts MATCH ?', (match,)
+            )
+            print(f'{search:<20} {like_ms:>10.1f} {like_rows:>8} {fts_ms:>10.1f} {fts_rows:>8}')
+        conn.close()
+
+
+if __name__ == '__main__':
+    sizes = sys.argv[1] if len(sys.argv) > 1 else '100000,1000000'
+    for rows in sizes.split(','):
+        run(int(rows))
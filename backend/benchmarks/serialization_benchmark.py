@@ -0,0 +1,51 @@
+"""Per-row cost of turning solicitacoes into JSON: building the dicts, then encoding them.
+
+Runs against the configured database (seed it first). Run from backend/:
+    python -m benchmarks.serialization_benchmark [--rows 2000]
+"""
+import argparse
+import json
+import time
+
+from app import app
+from models import Solicitacao
+from serialization import dumps_bytes, orjson
+
+REPEAT = 7
+
+
+def best_us_per_row(function, rows):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings) / rows * 1e6
+
+
+def run(rows):
+    with app.app_context():
+        solicitacoes = Solicitacao.query.options(
+            *Solicitacao.eager_options(include_user=True)
+        ).order_by(Solicitacao.id).limit(rows).all()
+        rows = len(solicitacoes)
+        data = Solicitacao.to_dict_many(solicitacoes)
+        fields = ['id', 'titulo', 'status', 'latitude', 'longitude', 'created_at']
+
+        cases = [
+            ('to_dict_many', lambda: Solicitacao.to_dict_many(solicitacoes)),
+            ('to_dict_many fields=6', lambda: Solicitacao.to_dict_many(solicitacoes, fields=fields)),
+            ('to_dict_many include_user', lambda: Solicitacao.to_dict_many(solicitacoes, include_user=True)),
+            ('json.dumps', lambda: json.dumps(data).encode('utf-8')),
+            (f'dumps_bytes ({"orjson" if orjson else "stdlib"})', lambda: dumps_bytes(data))
+        ]
+        print(f'{rows:,} rows')
+        print(f'{"case":<30} {"us/row":>8}')
+        for name, function in cases:
+            print(f'{name:<30} {best_us_per_row(function, rows):>8.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    run(parser.parse_args().rows)
@@ -0,0 +1,190 @@
+import csv
+import io
+from datetime import datetime
+from types import SimpleNamespace
+
+from extensions import db
+from geo import check_coordinates
+from models import Solicitacao, Vereador
+from pagination import keyset_page
+from ranking import rollup_snapshot, add_rollups, add_counters
+from reference_data import reference_data
+from changes import record_changes
+from analytics import add_analytics
+from serialization import dumps, loads
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+EXPORT_FIELDS = [field for field in Solicitacao.FIELD_COLUMNS if field != 'fotos_miniaturas']
+STATUSES = {'aberta', 'em_andamento', 'resolvida'}
+MAX_REPORTED_ERRORS = 100
+
+
+def _records(stream, format):
+    text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if format == 'csv':
+        # Line 1 is the header
+        for number, record in enumerate(csv.DictReader(text), start=2):
+            yield number, record
+    else:
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                yield number, line
+
+
+def _optional(record, field, convert):
+    value = record.get(field)
+    if value is None or value == '':
+        return None
+    return convert(value)
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'sim', 'yes')
+
+
+def _row(record, user_id, vereador_ids):
+    if isinstance(record, str):
+        record = loads(record)
+    if not isinstance(record, dict):
+        raise ValueError('record must be an object')
+
+    for field in ('titulo', 'descricao'):
+        if not record.get(field):
+            raise ValueError(f'{field} is required')
+
+    categoria_id = _optional(record, 'categoria_id', int)
+    if categoria_id is not None and not reference_data.has_categoria(categoria_id):
+        raise ValueError(f'unknown categoria_id: {categoria_id}')
+    if categoria_id is None and record.get('categoria'):
+        categoria_id = reference_data.categoria_id(record['categoria'])
+    if categoria_id is None:
+        raise ValueError('unknown or missing categoria')
+
+    status = record.get('status') or 'aberta'
+    if status not in STATUSES:
+        raise ValueError(f'invalid status: {status}')
+
+    vereador_id = _optional(record, 'vereador_id', int)
+    if vereador_id is not None and vereador_id not in vereador_ids:
+        raise ValueError(f'unknown vereador_id: {vereador_id}')
+
+    fotos = record.get('fotos') or []
+    if isinstance(fotos, str):
+        fotos = [foto for foto in fotos.split(';') if foto]
+
+    latitude = _optional(record, 'latitude', float)
+    longitude = _optional(record, 'longitude', float)
+    if latitude is not None or longitude is not None:
+        # A missing half is checked as 0
+        check_coordinates(0.0 if latitude is None else latitude, 0.0 if longitude is None else longitude)
+
+    created_at = _optional(record, 'created_at', datetime.fromisoformat) or datetime.utcnow()
+    updated_at = _optional(record, 'updated_at', datetime.fromisoformat) or created_at
+    tempo_resolucao = _optional(record, 'tempo_resolucao', int)
+    if tempo_resolucao is not None and tempo_resolucao < 0:
+        raise ValueError(f'invalid tempo_resolucao: {tempo_resolucao}')
+    if status == 'resolvida' and tempo_resolucao is None:
+        tempo_resolucao = max(0, (updated_at - created_at).days)
+
+    return {
+        'titulo': record['titulo'],
+        'categoria_id': categoria_id,
+        'descricao': record['descricao'],
+        'endereco': record.get('endereco') or None,
+        'bairro_id': reference_data.get_or_create_bairro_id(record['bairro']) if record.get('bairro') else None,
+        'cep': record.get('cep') or None,
+        'latitude': latitude,
+        'longitude': longitude,
+        'fotos': fotos,
+        'status': status,
+        'anonimo': _parse_bool(record.get('anonimo', False)),
+        'user_id': user_id,
+        'vereador_id': vereador_id,
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'tempo_resolucao': tempo_resolucao
+    }
+
+
+def _insert(rows):
+    if not rows:
+        return
+    # One batched INSERT .. RETURNING per chunk; the ids feed the change log, the FTS triggers index each row
+    inserted = db.session.execute(db.insert(Solicitacao).returning(Solicitacao.id, Solicitacao.status), rows)
+    record_changes(inserted.all(), 'criada')
+    add_rollups(rollup_snapshot(SimpleNamespace(**row)) for row in rows)
+    add_counters(rows)
+    add_analytics(rows)
+    db.session.commit()
+
+
+def new_summary():
+    return {'importadas': 0, 'rejeitadas': 0, 'erros': []}
+
+
+def import_solicitacoes(stream, format, user_id, chunk_size=1000, summary=None):
+    """Insert solicitacoes from an NDJSON/CSV byte stream in chunks; bad lines are skipped and reported.
+
+    Each chunk is committed as it fills. Pass `summary` (from new_summary()) to still have the
+    counts of the chunks already committed when reading the stream fails partway.
+    """
+    vereador_ids = {id for id, in db.session.query(Vereador.id)}
+    if summary is None:
+        summary = new_summary()
+    rows = []
+
+    for number, record in _records(stream, format):
+        try:
+            rows.append(_row(record, user_id, vereador_ids))
+        except (ValueError, TypeError) as e:
+            summary['rejeitadas'] += 1
+            if len(summary['erros']) < MAX_REPORTED_ERRORS:
+                summary['erros'].append({'linha': number, 'erro': str(e)})
+            continue
+
+        if len(rows) >= chunk_size:
+            _insert(rows)
+            summary['importadas'] += len(rows)
+            rows = []
+
+    _insert(rows)
+    summary['importadas'] += len(rows)
+    return summary
+
+
+def _csv_value(field, value):
+    if field == 'fotos':
+        return ';'.join(value)
+    return '' if value is None else value
+
+
+def export_solicitacoes(query, format, batch_size=1000):
+    """Yield the rows of `query` as NDJSON/CSV text, one keyset page at a time."""
+    query = query.options(*Solicitacao.eager_options())
+    if format == 'csv':
+        yield ','.join(EXPORT_FIELDS) + '\r\n'
+
+    cursor = None
+    while True:
+        solicitacoes, cursor = keyset_page(query, Solicitacao, batch_size, cursor)
+        buffer = io.StringIO()
+        if format == 'csv':
+            writer = csv.writer(buffer)
+            for solicitacao in solicitacoes:
+                data = solicitacao.to_dict(fields=EXPORT_FIELDS)
+                writer.writerow([_csv_value(field, data[field]) for field in EXPORT_FIELDS])
+        else:
+            for solicitacao in solicitacoes:
+                buffer.write(dumps(solicitacao.to_dict(fields=EXPORT_FIELDS)))
+                buffer.write('\n')
+        yield buffer.getvalue()
+
+        # Keep memory flat: nothing from earlier pages is needed again
+        db.session.expunge_all()
+        if not cursor:
+            break
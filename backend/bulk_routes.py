@@ -0,0 +1,87 @@
+import click
+from flask import request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
+from extensions import db
+from models import Solicitacao
+from identity import current_identity
+from bulk import FORMATS, new_summary, import_solicitacoes, export_solicitacoes
+from solicitacao_routes import filter_solicitacoes
+
+def register_bulk_routes(app):
+    @app.route('/api/solicitacoes/import', methods=['POST'])
+    @jwt_required()
+    def bulk_import_solicitacoes():
+        try:
+            identity = current_identity()
+            if not identity or identity['tipo_usuario'] != 'vereador':
+                return jsonify({'error': 'Unauthorized'}), 403
+            
+            format = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+            if format not in FORMATS:
+                return jsonify({'error': f'Unsupported format: {format}'}), 400
+            
+            # Read the body as a stream with its own size limit instead of MAX_CONTENT_LENGTH.
+            # A declared Content-Length over it fails here, before anything is imported
+            summary = new_summary()
+            stream = get_input_stream(request.environ, max_content_length=app.config['BULK_IMPORT_MAX_BYTES'])
+            import_solicitacoes(
+                stream, format, identity['user_id'], chunk_size=app.config['BULK_IMPORT_CHUNK_SIZE'], summary=summary
+            )
+            
+            return jsonify(summary), 200
+            
+        except RequestEntityTooLarge:
+            # A chunked body went over the limit partway: the chunks already committed stay
+            db.session.rollback()
+            return jsonify({
+                'error': f"Import body larger than {app.config['BULK_IMPORT_MAX_BYTES']} bytes",
+                **summary
+            }), 413
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/solicitacoes/export', methods=['GET'])
+    def bulk_export_solicitacoes():
+        format = request.args.get('format', 'ndjson')
+        if format not in FORMATS:
+            return jsonify({'error': f'Unsupported format: {format}'}), 400
+        
+        try:
+            query = filter_solicitacoes(Solicitacao.query, request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        response = Response(
+            stream_with_context(export_solicitacoes(query, format)),
+            mimetype=FORMATS[format]
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename=solicitacoes.{format}'
+        return response
+
+    @app.cli.command('import-solicitacoes')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'format', type=click.Choice(list(FORMATS)), default=None)
+    @click.option('--user-id', type=int, required=True, help='User the imported solicitações belong to.')
+    @click.option('--chunk-size', type=int, default=None)
+    def import_solicitacoes_command(path, format, user_id, chunk_size):
+        """Bulk-load solicitações from an NDJSON or CSV file."""
+        format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+        with open(path, 'rb') as stream:
+            summary = import_solicitacoes(
+                stream, format, user_id, chunk_size=chunk_size or app.config['BULK_IMPORT_CHUNK_SIZE']
+            )
+        click.echo(f"{summary['importadas']} imported, {summary['rejeitadas']} rejected")
+        for erro in summary['erros']:
+            click.echo(f"  line {erro['linha']}: {erro['erro']}")
+
+    @app.cli.command('export-solicitacoes')
+    @click.argument('path', type=click.Path(dir_okay=False, writable=True))
+    @click.option('--format', 'format', type=click.Choice(list(FORMATS)), default=None)
+    def export_solicitacoes_command(path, format):
+        """Dump every solicitação to an NDJSON or CSV file."""
+        format = format or ('csv' if path.endswith('.csv') else 'ndjson')
+        with open(path, 'w', encoding='utf-8', newline='') as output:
+            for chunk in export_solicitacoes(Solicitacao.query, format):
+                output.write(chunk)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class TTLCache:
+    """Small process-local cache; entries expire after `ttl` seconds or when cleared."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        # Returns (value, age in seconds) or None on a miss
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age > self.ttl:
+                del self._entries[key]
+                return None
+            return value, age
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def clear_on_commit(cache, *models, key=None):
+    """Clear `cache` after any commit that inserted, updated or deleted one of `models`.
+
+    With `key`, only `cache.invalidate(key(obj))` is called for each written object.
+    """
+    slot = ('dirty_cache', id(cache))
+    everything = object()
+
+    def mark_writes(session, flush_context, instances):
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, models):
+                keys = session.info.setdefault(slot, set())
+                if key is None:
+                    return
+                keys.add(key(obj))
+
+    def mark_bulk_writes(orm_execute_state):
+        # insert()/update()/delete() statements bypass the unit of work, so the keys are unknown
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            mapper = orm_execute_state.bind_mapper
+            if mapper is not None and issubclass(mapper.class_, models):
+                orm_execute_state.session.info.setdefault(slot, set()).add(everything)
+
+    def clear_marked(session):
+        keys = session.info.pop(slot, None)
+        if keys is None:
+            return
+        if key is None or everything in keys:
+            cache.clear()
+        else:
+            for k in keys:
+                cache.invalidate(k)
+
+    def forget_marked(session):
+        session.info.pop(slot, None)
+
+    event.listen(Session, 'before_flush', mark_writes)
+    event.listen(Session, 'do_orm_execute', mark_bulk_writes)
+    event.listen(Session, 'after_commit', clear_marked)
+    event.listen(Session, 'after_rollback', forget_marked)
@@ -0,0 +1,49 @@
+from flask import request, jsonify, Response, stream_with_context
+from changes import latest_change_id, changes_since, change_events
+
+def register_change_routes(app):
+    @app.route('/api/solicitacoes/changes', methods=['GET'])
+    def get_solicitacao_changes():
+        try:
+            since = request.args.get('since', type=int)
+            solicitacao_id = request.args.get('solicitacao_id', type=int)
+            limit = request.args.get('limit', app.config['CHANGE_FEED_PAGE_SIZE'], type=int)
+            limit = max(1, min(limit, app.config['CHANGE_FEED_PAGE_SIZE']))
+            
+            # No cursor yet: hand out the current position to start from
+            if since is None:
+                return jsonify({'changes': [], 'solicitacoes': [], 'last_id': latest_change_id(), 'has_more': False}), 200
+            
+            changes, solicitacoes = changes_since(since, limit, solicitacao_id)
+            return jsonify({
+                'changes': [change.to_dict() for change in changes],
+                'solicitacoes': [solicitacao.to_dict() for solicitacao in solicitacoes.values()],
+                'last_id': changes[-1].id if changes else since,
+                'has_more': len(changes) == limit
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/solicitacoes/changes/stream', methods=['GET'])
+    def stream_solicitacao_changes():
+        # EventSource sends Last-Event-ID on reconnect
+        since = request.headers.get('Last-Event-ID', type=int)
+        if since is None:
+            since = request.args.get('since', type=int)
+        if since is None:
+            since = latest_change_id()
+        
+        response = Response(
+            stream_with_context(change_events(
+                since,
+                app.config['CHANGE_FEED_PAGE_SIZE'],
+                app.config['CHANGE_FEED_POLL_INTERVAL'],
+                app.config['CHANGE_FEED_STREAM_TIMEOUT'],
+                request.args.get('solicitacao_id', type=int)
+            )),
+            mimetype='text/event-stream'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
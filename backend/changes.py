@@ -0,0 +1,84 @@
+import time
+
+from extensions import db
+from models import Solicitacao, SolicitacaoChange
+from serialization import dumps
+
+HEARTBEAT_SECONDS = 15
+# Client reconnect delay after the server closes a stream, in milliseconds
+RETRY_MS = 2000
+# pg_advisory_xact_lock key that orders writers of the change feed
+FEED_LOCK_KEY = 5_160_816
+
+
+def _lock_feed():
+    # Postgres hands out ids before commit, so a slow transaction could commit an id below one
+    # a reader has already been served. Holding this lock from taking the id until commit makes
+    # ids commit in order. SQLite serializes writers anyway
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': FEED_LOCK_KEY})
+
+
+def record_change(solicitacao, acao):
+    """Append to the change feed; call after flush, inside the transaction that writes the solicitacao."""
+    _lock_feed()
+    db.session.add(SolicitacaoChange(solicitacao_id=solicitacao.id, acao=acao, status=solicitacao.status))
+
+
+def record_changes(rows, acao):
+    """Append many (solicitacao_id, status) pairs at once, for bulk writes."""
+    rows = [{'solicitacao_id': id, 'acao': acao, 'status': status} for id, status in rows]
+    if rows:
+        _lock_feed()
+        db.session.execute(db.insert(SolicitacaoChange), rows)
+
+
+def latest_change_id():
+    return db.session.query(db.func.max(SolicitacaoChange.id)).scalar() or 0
+
+
+def changes_since(since, limit, solicitacao_id=None):
+    """Changes after `since` in feed order, plus the current state of each solicitacao they touch."""
+    # Ids become visible in order (see _lock_feed), so nothing below `since` can still appear
+    query = SolicitacaoChange.query.filter(SolicitacaoChange.id > since)
+    if solicitacao_id is not None:
+        query = query.filter_by(solicitacao_id=solicitacao_id)
+    changes = query.order_by(SolicitacaoChange.id).limit(limit).all()
+
+    ids = {change.solicitacao_id for change in changes}
+    solicitacoes = Solicitacao.query.options(
+        *Solicitacao.eager_options()
+    ).filter(Solicitacao.id.in_(ids)).all() if ids else []
+    return changes, {solicitacao.id: solicitacao for solicitacao in solicitacoes}
+
+
+def _event(change, solicitacao):
+    data = dumps({
+        'change': change.to_dict(),
+        'solicitacao': solicitacao.to_dict() if solicitacao else None
+    })
+    return f'id: {change.id}\nevent: change\ndata: {data}\n\n'
+
+
+def change_events(since, limit, poll_interval, timeout, solicitacao_id=None):
+    """Server-sent events for every change after `since`; ends after `timeout` seconds so clients reconnect."""
+    yield f'retry: {RETRY_MS}\n\n'
+    deadline = time.monotonic() + timeout
+    last_sent = time.monotonic()
+    while time.monotonic() < deadline:
+        changes, solicitacoes = changes_since(since, limit, solicitacao_id)
+        events = [_event(change, solicitacoes.get(change.solicitacao_id)) for change in changes]
+        if changes:
+            since = changes[-1].id
+        # Hand the connection back to the pool while idle
+        db.session.remove()
+        for event in events:
+            yield event
+        if changes:
+            last_sent = time.monotonic()
+            if len(changes) == limit:
+                continue
+        elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            yield ': keep-alive\n\n'
+            last_sent = time.monotonic()
+        time.sleep(poll_interval)
@@ -0,0 +1,122 @@
+import os
+from datetime import timedelta
+
+from dotenv import load_dotenv
+
+from serialization import dumps, loads
+
+load_dotenv()
+
+
+def _database_url(variable='DATABASE_URL', default='sqlite:///cidadao_ativo.db'):
+    url = os.environ.get(variable, default)
+    # Some providers still hand out the pre-SQLAlchemy-1.4 scheme
+    if url and url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = _database_url()
+    # Read replica for GET handlers, e.g. sqlite:///cidadao_ativo_replica.db locally; unset = primary only
+    DATABASE_REPLICA_URL = _database_url('DATABASE_REPLICA_URL', None)
+    # After a write, that client reads from the primary for this long (replication lag budget)
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=7)
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+    # Requests with a larger Content-Length are rejected with 413 before the body is read
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_UPLOAD_MB', 10)) * 1024 * 1024
+    # Bulk import streams the body and has its own, larger limit
+    BULK_IMPORT_MAX_BYTES = int(os.environ.get('BULK_IMPORT_MAX_MB', 1024)) * 1024 * 1024
+    BULK_IMPORT_CHUNK_SIZE = 1000
+    SOLICITACOES_PAGE_SIZE = 50
+    SOLICITACOES_MAX_PAGE_SIZE = 200
+    STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', 60))
+    # Per-process caches are cleared on commit only in the process that wrote; other
+    # gunicorn workers see the change after these many seconds
+    REFERENCE_DATA_TTL = int(os.environ.get('REFERENCE_DATA_TTL', 60))
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 30))
+    # s-maxage for CDN/reverse proxies on public read endpoints; browsers always revalidate
+    HTTP_CACHE_SHARED_MAX_AGE = int(os.environ.get('HTTP_CACHE_SHARED_MAX_AGE', 10))
+    CHANGE_FEED_PAGE_SIZE = 200
+    CHANGE_FEED_POLL_INTERVAL = float(os.environ.get('CHANGE_FEED_POLL_INTERVAL', 1))
+    # Each open stream holds a worker thread; clients reconnect with Last-Event-ID when it ends
+    CHANGE_FEED_STREAM_TIMEOUT = int(os.environ.get('CHANGE_FEED_STREAM_TIMEOUT', 300))
+
+    # /api/analytics/timeseries: range when no `from` is given, and most periods per series
+    ANALYTICS_DEFAULT_DAYS = 182
+    ANALYTICS_MAX_PERIODS = 400
+
+    # Duplicate detection on create (duplicates.py): an open solicitacao of the same categoria
+    # within this many metres and days whose text is at least this similar (0-1) gets the new
+    # report as an apoio. DEDUP_RADIUS_METERS=0 turns it off
+    DEDUP_RADIUS_METERS = int(os.environ.get('DEDUP_RADIUS_METERS', 100))
+    DEDUP_WINDOW_DAYS = int(os.environ.get('DEDUP_WINDOW_DAYS', 30))
+    DEDUP_SIMILARITY = float(os.environ.get('DEDUP_SIMILARITY', 0.3))
+    DEDUP_MAX_CANDIDATES = 200
+
+    # Open-data Parquet snapshots (snapshots.py): where they go, rows per read batch,
+    # how many to keep and how often the scheduled job runs
+    EXPORT_FOLDER = os.environ.get('EXPORT_FOLDER', 'exports')
+    SNAPSHOT_BATCH_SIZE = int(os.environ.get('SNAPSHOT_BATCH_SIZE', 50000))
+    SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', 3))
+    SNAPSHOT_INTERVAL_HOURS = int(os.environ.get('SNAPSHOT_INTERVAL_HOURS', 24))
+
+    # Background jobs (jobs.py): attempts before a job is marked failed, first retry delay
+    # in seconds (doubled on each retry), worker poll interval, and how long a job may stay
+    # running before it is considered abandoned by a dead worker
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', 10))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+    JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 600))
+
+    # bcrypt cost factor and the process pool that runs it (0 = hash inline)
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT', 30))
+
+    # Login/register throttling: burst size and refill per minute, per (email, client IP) and per IP
+    LOGIN_RATE_LIMIT_EMAIL = (5, 5)
+    LOGIN_RATE_LIMIT_IP = (20, 20)
+    # Reverse proxies in front of the app that set X-Forwarded-For/-Proto. The per-IP limit
+    # keys on the client address, so behind a proxy this must be set or all clients share one
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+
+    # Connection pool, only used by server databases (Postgres)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+    # SQLite: seconds a writer waits for the lock before "database is locked"
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 30))
+
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')  # text, json
+
+    # Request/SQL metrics at /metrics; off by default
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION', '').lower() in ('1', 'true', 'yes')
+    # Bearer token /metrics requires; without it the endpoint is not registered
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    # Same statement this many times in one request is reported as a possible N+1
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+    # Fraction of requests run under cProfile, dumped as .prof files
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+
+def engine_options(config, url=None):
+    # JSON columns go through the same encoder as the responses
+    options = {'json_serializer': dumps, 'json_deserializer': loads}
+    if (url or config['SQLALCHEMY_DATABASE_URI']).startswith('sqlite'):
+        return {**options, 'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT']}}
+    return {
+        **options,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True
+    }
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Apoio, Solicitacao
+from geo import filter_radius
+from similarity import text_signature, similarity
+from changes import record_change
+
+
+def find_duplicate(categoria_id, latitude, longitude, signature, radius, window_days, threshold, max_candidates=200):
+    """The open solicitacao a new report most likely duplicates, as (solicitacao, similaridade), or (None, 0).
+
+    Candidates come from the geohash index (same categoria, within `radius` metres, created in the
+    last `window_days`), so the cost follows how many reports are nearby, not the table size. Their
+    stored MinHash signatures are compared with `signature`; no ORM objects are built for them.
+    """
+    if latitude is None or longitude is None or not signature or radius <= 0:
+        return None, 0
+    query = db.session.query(
+        Solicitacao.id, Solicitacao.assinatura, Solicitacao.titulo, Solicitacao.descricao
+    ).filter(
+        # + 0 keeps SQLite off the categoria index; the geohash cells are far more selective
+        Solicitacao.categoria_id + 0 == categoria_id,
+        Solicitacao.status != 'resolvida',
+        Solicitacao.created_at >= datetime.utcnow() - timedelta(days=window_days)
+    )
+    # Newest first, so a busy area caps out on current reports rather than arbitrary ones
+    candidates = filter_radius(query, Solicitacao, latitude, longitude, radius).order_by(
+        Solicitacao.created_at.desc()
+    ).limit(max_candidates).all()
+
+    best_id, best = None, 0
+    for id, assinatura, titulo, descricao in candidates:
+        # Rows from before signatures existed are hashed here
+        score = similarity(signature, assinatura or text_signature(titulo, descricao))
+        if score >= threshold and (score > best or (score == best and id < best_id)):
+            best_id, best = id, score
+    if best_id is None:
+        return None, 0
+    return db.session.get(Solicitacao, best_id), best
+
+
+def add_apoio(solicitacao, user_id, data, similaridade):
+    """Record `data` (a create payload) as support for `solicitacao`. Returns the Apoio, or None
+    when the user filed that solicitacao or already supports it (also when a concurrent request
+    of theirs got there first)."""
+    if solicitacao.user_id == user_id or Apoio.query.filter_by(
+        solicitacao_id=solicitacao.id, user_id=user_id
+    ).first():
+        return None
+    apoio = Apoio(
+        solicitacao_id=solicitacao.id,
+        user_id=user_id,
+        titulo=data['titulo'],
+        descricao=data['descricao'],
+        latitude=data.get('latitude'),
+        longitude=data.get('longitude'),
+        fotos=data.get('fotos', []),
+        similaridade=similaridade,
+        anonimo=data.get('anonimo', False)
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(apoio)
+            db.session.flush()
+            # Relative increment for concurrent supporters. An apoio is not an edit, so updated_at
+            # (which tempo_resolucao is measured from) stays as it was
+            db.session.execute(
+                db.update(Solicitacao).where(Solicitacao.id == solicitacao.id).values(
+                    total_apoios=Solicitacao.total_apoios + 1, updated_at=Solicitacao.updated_at
+                )
+            )
+    except IntegrityError:
+        # A concurrent request from the same user added it first (uq_apoios_solicitacao_user)
+        return None
+    record_change(solicitacao, 'apoiada')
+    return apoio
@@ -1,7 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
+from passwords import PasswordHasher
+from replicas import RoutingSession
 
-db = SQLAlchemy()
-bcrypt = Bcrypt()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
+migrate = Migrate()
+passwords = PasswordHasher()
@@ -0,0 +1,124 @@
+import math
+
+from extensions import db
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+METERS_PER_DEGREE = 111320.0
+# A bbox filter is expanded into at most this many geohash prefix ranges
+MAX_COVER_CELLS = 32
+# Map zoom level -> geohash length used to group markers into clusters
+ZOOM_PRECISION = [1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 5, 5, 5, 6, 6, 7, 7, 8]
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    if latitude is None or longitude is None:
+        return None
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, bit_count, even = [], 0, 0, True
+    while len(geohash) < precision:
+        target, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (target[0] + target[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            target[0] = middle
+        else:
+            target[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def _cell_size(precision):
+    # (height, width) in degrees of one geohash cell
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def cover_prefixes(min_lat, min_lng, max_lat, max_lng):
+    """Smallest set of geohash prefixes, at the finest usable precision, covering the box."""
+    prefixes = {''}
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = _cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lng / width) - math.floor(min_lng / width) + 1
+        if rows * cols > MAX_COVER_CELLS:
+            break
+        prefixes = {
+            encode_geohash(
+                min(max_lat, (math.floor(min_lat / height) + row) * height + height / 2),
+                min(max_lng, (math.floor(min_lng / width) + col) * width + width / 2),
+                precision
+            )
+            for row in range(rows) for col in range(cols)
+        }
+    return prefixes
+
+
+def check_coordinates(latitude, longitude):
+    # float() accepts inf and nan, which the geohash code can't handle
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        raise ValueError('coordinates must be finite numbers')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('latitude must be within -90..90 and longitude within -180..180')
+
+
+def parse_bbox(value):
+    # west,south,east,north (GeoJSON order)
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('bbox must be min_lng,min_lat,max_lng,max_lat')
+    check_coordinates(min_lat, min_lng)
+    check_coordinates(max_lat, max_lng)
+    if min_lat > max_lat or min_lng > max_lng:
+        raise ValueError('bbox min must be below max')
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def parse_near(value):
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('near must be lat,lng')
+    check_coordinates(latitude, longitude)
+    return latitude, longitude
+
+
+def radius_bbox(latitude, longitude, radius):
+    dlat = radius / METERS_PER_DEGREE
+    dlng = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return latitude - dlat, longitude - dlng, latitude + dlat, longitude + dlng
+
+
+def filter_bbox(query, model, min_lat, min_lng, max_lat, max_lng):
+    # Geohash ranges narrow the index scan, the exact bounds trim the cell edges
+    ranges = [
+        db.and_(model.geohash >= prefix, model.geohash < prefix + '~')
+        for prefix in sorted(cover_prefixes(min_lat, min_lng, max_lat, max_lng))
+        if prefix
+    ]
+    if ranges:
+        query = query.filter(db.or_(*ranges))
+    return query.filter(
+        model.latitude.between(min_lat, max_lat),
+        model.longitude.between(min_lng, max_lng)
+    )
+
+
+def filter_radius(query, model, latitude, longitude, radius):
+    query = filter_bbox(query, model, *radius_bbox(latitude, longitude, radius))
+    # Equirectangular distance: plain arithmetic, so it runs on any database
+    scale = math.cos(math.radians(latitude))
+    dy = model.latitude - latitude
+    dx = (model.longitude - longitude) * scale
+    return query.filter(dx * dx + dy * dy <= (radius / METERS_PER_DEGREE) ** 2)
+
+
+def zoom_precision(zoom):
+    return ZOOM_PRECISION[max(0, min(zoom, len(ZOOM_PRECISION) - 1))]
@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+
+from flask import current_app, request, Response
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import Solicitacao, SolicitacaoChange, TableVersion, Vereador, VereadorArea, Categoria, Bairro
+
+# Tables the cached read endpoints embed next to solicitacoes (names, partidos, areas)
+VERSIONED_MODELS = (Vereador, VereadorArea, Categoria, Bairro)
+
+
+def _bump_version(mapper, connection, target):
+    table = TableVersion.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    insert = dialect.insert(table).values(name=mapper.local_table.name, version=1, updated_at=datetime.utcnow())
+    connection.execute(insert.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'version': table.c.version + 1, 'updated_at': insert.excluded.updated_at}
+    ))
+
+
+for _model in VERSIONED_MODELS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        db.event.listen(_model, _event, _bump_version)
+
+
+def data_version():
+    """(etag, last_modified) that move on every solicitacao write and on ORM writes to
+    VERSIONED_MODELS; all lookups are by primary key or on the few table_versions rows."""
+    # The change log id bumps on every create/update (bulk imports included);
+    # max(id) also catches rows inserted without going through it, e.g. the seed
+    latest = db.session.query(db.func.max(SolicitacaoChange.id)).scalar_subquery()
+    change_id, changed_at, max_id, version, versioned_at = db.session.query(
+        latest,
+        db.session.query(SolicitacaoChange.created_at).filter(SolicitacaoChange.id == latest).scalar_subquery(),
+        db.session.query(db.func.max(Solicitacao.id)).scalar_subquery(),
+        db.session.query(db.func.sum(TableVersion.version)).scalar_subquery(),
+        db.session.query(db.func.max(TableVersion.updated_at)).scalar_subquery()
+    ).one()
+    last_modified = max((value for value in (changed_at, versioned_at) if value), default=None)
+    return f'{change_id or 0}-{max_id or 0}-{version or 0}', last_modified
+
+
+def _http_date(value):
+    # Stored datetimes are naive UTC; HTTP dates have second precision
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value else None
+
+
+def not_modified(etag, last_modified=None):
+    """304 response when the request validators still match, else None; checked before any serialization."""
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = _http_date(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+    if fresh:
+        return cacheable(Response(status=304), etag, last_modified)
+    return None
+
+
+def cacheable(response, etag, last_modified=None):
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = _http_date(last_modified)
+    # Browsers revalidate every time (cheap with the 304 path); shared caches may serve it for a while
+    response.headers['Cache-Control'] = f"public, max-age=0, s-maxage={current_app.config['HTTP_CACHE_SHARED_MAX_AGE']}"
+    return response
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from cache import clear_on_commit
+from extensions import db
+from models import User, Vereador
+
+
+class IdentityCache:
+    """LRU of user id -> serialized user, role and vereador id.
+
+    Entries expire after IDENTITY_CACHE_TTL seconds, so role changes and deleted users made
+    through other workers (whose commits don't clear this process's cache) are seen soon.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            if user_id in self._entries:
+                identity, stored_at = self._entries[user_id]
+                if time.monotonic() - stored_at <= current_app.config['IDENTITY_CACHE_TTL']:
+                    self._entries.move_to_end(user_id)
+                    return identity
+                del self._entries[user_id]
+
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        vereador = None
+        if user.tipo_usuario == 'vereador':
+            vereador = Vereador.query.filter_by(user_id=user.id).first()
+        identity = {
+            'user': user.to_dict(),
+            'tipo_usuario': user.tipo_usuario,
+            'vereador_id': vereador.id if vereador else None
+        }
+
+        with self._lock:
+            self._entries[user_id] = (identity, time.monotonic())
+            self._entries.move_to_end(user_id)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+clear_on_commit(
+    identity_cache, User, Vereador,
+    key=lambda obj: obj.id if isinstance(obj, User) else obj.user_id
+)
+
+
+def identity_claims(user_id):
+    """Extra JWT claims so authorization checks don't need the database."""
+    identity = identity_cache.get(user_id)
+    return {
+        'tipo_usuario': identity['tipo_usuario'],
+        'vereador_id': identity['vereador_id']
+    }
+
+
+def current_identity():
+    user_id = int(get_jwt_identity())
+    claims = get_jwt()
+    if 'tipo_usuario' in claims:
+        return {'user_id': user_id, 'tipo_usuario': claims['tipo_usuario'], 'vereador_id': claims.get('vereador_id')}
+
+    # Tokens issued before the claims existed
+    identity = identity_cache.get(user_id)
+    if not identity:
+        return None
+    return {'user_id': user_id, 'tipo_usuario': identity['tipo_usuario'], 'vereador_id': identity['vereador_id']}
@@ -0,0 +1,232 @@
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from flask import Response, g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+from extensions import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger('cidadao_ativo.requests')
+
+# LogRecord attributes; anything else on a record came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in _RECORD_FIELDS)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def configure_logging(app):
+    """Root handler from LOG_LEVEL/LOG_FORMAT and a log line per 5xx; below the level a log call is one isEnabledFor check."""
+    root = logging.getLogger()
+    root.setLevel(app.config['LOG_LEVEL'])
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        if app.config['LOG_FORMAT'] == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        root.addHandler(handler)
+
+    @app.after_request
+    def _log_server_errors(response):
+        # Handlers turn exceptions into {'error': ...} 500s; keep a trace of them
+        if response.status_code >= 500 and response.is_json:
+            logger.error('Request failed', extra={
+                'method': request.method,
+                'endpoint': request.url_rule.rule if request.url_rule else 'unmatched',
+                'status': response.status_code,
+                'error': (response.get_json(silent=True) or {}).get('error')
+            })
+        return response
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines, cumulative = [], 0
+        for bucket, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bucket}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _labels(method, endpoint, **extra):
+    labels = {'method': method, 'endpoint': endpoint, **extra}
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+class Metrics:
+    """Per-process request and SQL metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.sql_seconds = Counter()
+        self.responses = Counter()
+        self.n_plus_one = Counter()
+
+    def record(self, method, endpoint, status, elapsed, stats, repeated):
+        key = (method, endpoint)
+        with self.lock:
+            self.latency[key].observe(elapsed)
+            self.queries[key].observe(stats['count'])
+            self.sql_seconds[key] += stats['seconds']
+            self.responses[key + (status,)] += 1
+            if repeated:
+                self.n_plus_one[key] += 1
+
+    def render(self):
+        with self.lock:
+            lines = ['# TYPE http_request_duration_seconds histogram']
+            for key, histogram in sorted(self.latency.items()):
+                lines += histogram.render('http_request_duration_seconds', _labels(*key))
+            lines.append('# TYPE http_responses_total counter')
+            for (method, endpoint, status), count in sorted(self.responses.items()):
+                lines.append(f'http_responses_total{{{_labels(method, endpoint, status=status)}}} {count}')
+            lines.append('# TYPE sql_queries_per_request histogram')
+            for key, histogram in sorted(self.queries.items()):
+                lines += histogram.render('sql_queries_per_request', _labels(*key))
+            lines.append('# TYPE sql_query_seconds_total counter')
+            for key, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'sql_query_seconds_total{{{_labels(*key)}}} {seconds}')
+            lines.append('# TYPE sql_n_plus_one_requests_total counter')
+            for key, count in sorted(self.n_plus_one.items()):
+                lines.append(f'sql_n_plus_one_requests_total{{{_labels(*key)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_stats' in g:
+        context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_instrumentation_start', None)
+    if start is None or not has_request_context():
+        return
+    stats = g.get('sql_stats')
+    if stats is not None:
+        stats['count'] += 1
+        stats['seconds'] += time.perf_counter() - start
+        stats['statements'][statement] += 1
+
+
+def init_instrumentation(app):
+    """Opt-in (INSTRUMENTATION_ENABLED): nothing is hooked when it is off."""
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return None
+
+    metrics = Metrics()
+    threshold = app.config['N_PLUS_ONE_THRESHOLD']
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    profile_dir = os.path.abspath(app.config['PROFILE_DIR'])
+    # One profiled request at a time; concurrent profilers would fight over the interpreter hooks
+    profiling = threading.Lock()
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def _start_request():
+        g.request_start = time.perf_counter()
+        g.sql_stats = {'count': 0, 'seconds': 0.0, 'statements': Counter()}
+        if sample_rate and random.random() < sample_rate and profiling.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _finish_request(response):
+        if 'request_start' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_start
+        # Queries issued while a streamed body is sent are not attributed
+        stats = g.pop('sql_stats')
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        profiler = g.pop('profiler', None)
+        if profiler:
+            profiler.disable()
+            profiling.release()
+            os.makedirs(profile_dir, exist_ok=True)
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{request.method}-{request.endpoint or 'unmatched'}.prof"
+            profiler.dump_stats(os.path.join(profile_dir, name))
+
+        repeated = {statement: count for statement, count in stats['statements'].items() if count >= threshold}
+        for statement, count in repeated.items():
+            logger.warning('Possible N+1 query', extra={
+                'endpoint': endpoint, 'repeats': count, 'statement': ' '.join(statement.split())[:500]
+            })
+
+        metrics.record(request.method, endpoint, response.status_code, elapsed, stats, bool(repeated))
+        logger.info('Request', extra={
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'queries': stats['count'],
+            'sql_ms': round(stats['seconds'] * 1000, 2)
+        })
+        return response
+
+    @app.teardown_request
+    def _release_profiler(exception):
+        # after_request is skipped when a view raises
+        profiler = g.pop('profiler', None)
+        if profiler:
+            profiler.disable()
+            profiling.release()
+
+    # Endpoint names, traffic and latencies are not for the public: scrapers send the token
+    token = app.config['METRICS_TOKEN']
+    if not token:
+        logger.warning('METRICS_TOKEN is not set; /metrics is disabled')
+        return metrics
+
+    @app.route('/metrics', methods=['GET'])
+    def get_metrics():
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Unauthorized'}), 403
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
@@ -0,0 +1,42 @@
+import json
+
+import click
+from flask import request, jsonify
+from flask_jwt_extended import jwt_required
+from identity import current_identity
+from jobs import job_stats, prune_jobs, run_workers
+
+def register_job_routes(app):
+    @app.route('/api/jobs/stats', methods=['GET'])
+    @jwt_required()
+    def get_job_stats():
+        try:
+            identity = current_identity()
+            if not identity or identity['tipo_usuario'] != 'vereador':
+                return jsonify({'error': 'Unauthorized'}), 403
+            
+            window_hours = request.args.get('hours', 24, type=int)
+            return jsonify(job_stats(window_hours)), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.cli.command('run-jobs')
+    @click.option('--processes', default=1, show_default=True, help='Worker processes to run.')
+    @click.option('--burst', is_flag=True, help='Exit once no job is due instead of polling.')
+    def run_jobs_command(processes, burst):
+        """Run background job workers until interrupted."""
+        click.echo(f'{processes} job worker(s) started')
+        run_workers(processes, burst)
+
+    @app.cli.command('job-stats')
+    @click.option('--hours', default=24, show_default=True, help='Window for the timing figures.')
+    def job_stats_command(hours):
+        """Print queue depth and job timings as JSON."""
+        click.echo(json.dumps(job_stats(hours), indent=2))
+
+    @app.cli.command('prune-jobs')
+    @click.option('--days', default=7, show_default=True, help='Keep finished jobs this recent.')
+    def prune_jobs_command(days):
+        """Delete finished and failed jobs older than --days."""
+        click.echo(f'{prune_jobs(days)} job(s) deleted')
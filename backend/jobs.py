@@ -0,0 +1,272 @@
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import Job
+from uploads import generate_variants
+from snapshots import write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _photo_variants(digest, filename):
+    generate_variants(os.path.abspath(current_app.config['UPLOAD_FOLDER']), digest, filename)
+
+
+def _solicitacoes_snapshot():
+    # Schedule the next run first, so a failing snapshot doesn't end the chain
+    schedule_snapshot()
+    db.session.commit()
+    config = current_app.config
+    write_snapshot(os.path.abspath(config['EXPORT_FOLDER']), config['SNAPSHOT_BATCH_SIZE'], config['SNAPSHOT_KEEP'])
+
+
+# Job name -> handler(**payload). Handlers run inside an app context and may use db.session;
+# their writes are committed together with the job's status. A worker that dies mid-job
+# leaves it running until JOB_TIMEOUT and it is then retried, so handlers must be idempotent.
+HANDLERS = {
+    'photo_variants': _photo_variants,
+    'solicitacoes_snapshot': _solicitacoes_snapshot
+}
+
+
+def enqueue(name, payload=None, idempotency_key=None, delay=0, max_attempts=None):
+    """Add a job to the current transaction; workers pick it up once the caller commits.
+
+    Returns the job id, or None when a job with the same idempotency_key already exists.
+    """
+    if name not in HANDLERS:
+        raise ValueError(f'Unknown job: {name}')
+    now = datetime.utcnow()
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(Job).values(
+        name=name,
+        payload=json.dumps(payload or {}),
+        status='pending',
+        idempotency_key=idempotency_key,
+        attempts=0,
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_at=now + timedelta(seconds=delay),
+        created_at=now
+    )
+    if idempotency_key:
+        statement = statement.on_conflict_do_nothing(index_elements=['idempotency_key'])
+    return db.session.execute(statement.returning(Job.id)).scalar()
+
+
+def schedule_snapshot():
+    """Enqueue the next periodic snapshot. One job per SNAPSHOT_INTERVAL_HOURS slot, however often this is called."""
+    interval = current_app.config['SNAPSHOT_INTERVAL_HOURS'] * 3600
+    now = time.time()
+    next_slot = (int(now // interval) + 1) * interval
+    return enqueue(
+        'solicitacoes_snapshot', idempotency_key=f'solicitacoes_snapshot:{next_slot}', delay=next_slot - now
+    )
+
+
+def claim(worker_id):
+    """Mark the next due job as running for this worker and return it, or None."""
+    now = datetime.utcnow()
+    # SKIP LOCKED keeps Postgres workers off each other's rows; SQLite serializes the UPDATE anyway
+    next_id = db.select(Job.id).where(
+        Job.status == 'pending', Job.run_at <= now
+    ).order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True).scalar_subquery()
+    job_id = db.session.execute(
+        db.update(Job).where(Job.id == next_id, Job.status == 'pending').values(
+            status='running', locked_by=worker_id, started_at=now, attempts=Job.attempts + 1
+        ).returning(Job.id).execution_options(synchronize_session=False)
+    ).scalar()
+    db.session.commit()
+    return db.session.get(Job, job_id) if job_id else None
+
+
+def requeue_stale(timeout):
+    """Jobs left running longer than `timeout` seconds (dead worker) go back to pending, or fail if out of attempts."""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        db.update(Job).where(
+            Job.status == 'running', Job.started_at < now - timedelta(seconds=timeout)
+        ).values(
+            status=db.case((Job.attempts >= Job.max_attempts, 'failed'), else_='pending'),
+            finished_at=db.case((Job.attempts >= Job.max_attempts, now), else_=None),
+            locked_by=None,
+            last_error='Timed out'
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def run_job(job):
+    handler = HANDLERS.get(job.name)
+    job_id, name = job.id, job.name
+    start = time.perf_counter()
+    try:
+        if handler is None:
+            raise LookupError(f'No handler for job {name}')
+        handler(**json.loads(job.payload))
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = f'{type(e).__name__}: {e}'
+        job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            logger.exception('Job failed', extra={'job_id': job_id, 'job': name, 'attempts': job.attempts})
+        else:
+            # Exponential backoff: JOB_RETRY_DELAY, then 2x, 4x, ...
+            delay = current_app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            job.status = 'pending'
+            job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning('Job will be retried', extra={'job_id': job_id, 'job': name, 'retry_in': delay})
+    else:
+        job.status = 'done'
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        logger.info('Job done', extra={
+            'job_id': job_id, 'job': name, 'duration_ms': round((time.perf_counter() - start) * 1000, 2)
+        })
+    db.session.commit()
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def work(stop=None, burst=False):
+    """Run due jobs until `stop` is set, or until none is due when `burst`. Needs an app context."""
+    config = current_app.config
+    stop = stop or threading.Event()
+    name = worker_id()
+    processed = 0
+    last_reap = 0
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_reap >= min(config['JOB_TIMEOUT'], 60):
+                requeue_stale(config['JOB_TIMEOUT'])
+                last_reap = time.monotonic()
+            job = claim(name)
+            if job is None:
+                # Give the connection back while idle
+                db.session.remove()
+                if burst:
+                    break
+                stop.wait(config['JOB_POLL_INTERVAL'])
+                continue
+            run_job(job)
+            processed += 1
+        except Exception:
+            # e.g. "database is locked" or a lost connection: keep the worker alive. A job left
+            # running by a failed status commit is picked up again by requeue_stale
+            db.session.rollback()
+            db.session.remove()
+            logger.exception('Job worker error', extra={'worker': name})
+            stop.wait(config['JOB_POLL_INTERVAL'])
+    return processed
+
+
+def _stop_on_signals(stop):
+    def handle(signum, frame):
+        stop.set()
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+def _worker_process(burst):
+    # Spawned, so each process builds its own app and connection pool
+    from app import app
+    stop = threading.Event()
+    _stop_on_signals(stop)
+    with app.app_context():
+        work(stop, burst)
+
+
+def run_workers(processes=1, burst=False):
+    """Run `processes` workers until SIGINT/SIGTERM; the current job of each one is finished first."""
+    if processes <= 1:
+        stop = threading.Event()
+        _stop_on_signals(stop)
+        return work(stop, burst)
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_worker_process, args=(burst,), name=f'jobs-{n}') for n in range(processes)]
+    for process in workers:
+        process.start()
+    # The children get the terminal's SIGINT themselves; the parent just waits for them
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: [p.terminate() for p in workers])
+    for process in workers:
+        process.join()
+
+
+def start_worker_thread(app):
+    """Run jobs on a daemon thread of this process. For `python app.py` development only."""
+    def loop():
+        with app.app_context():
+            work()
+    thread = threading.Thread(target=loop, name='jobs', daemon=True)
+    thread.start()
+    return thread
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * fraction))], 2)
+
+
+def job_stats(window_hours=24):
+    """Queue depth by status plus per-job wait and run times over the last `window_hours`."""
+    now = datetime.utcnow()
+    depth = dict(db.session.query(Job.status, db.func.count()).group_by(Job.status).all())
+    oldest_due = db.session.query(db.func.min(Job.run_at)).filter(
+        Job.status == 'pending', Job.run_at <= now
+    ).scalar()
+
+    finished = db.session.query(Job.name, Job.status, Job.run_at, Job.started_at, Job.finished_at).filter(
+        Job.status.in_(('done', 'failed')), Job.finished_at >= now - timedelta(hours=window_hours)
+    ).all()
+    per_job = {}
+    for name, status, run_at, started_at, finished_at in finished:
+        entry = per_job.setdefault(name, {'done': 0, 'failed': 0, 'wait_ms': [], 'run_ms': []})
+        entry[status] += 1
+        if started_at:
+            entry['wait_ms'].append(max(0, (started_at - run_at).total_seconds() * 1000))
+            entry['run_ms'].append((finished_at - started_at).total_seconds() * 1000)
+    for entry in per_job.values():
+        wait_ms, run_ms = entry.pop('wait_ms'), entry.pop('run_ms')
+        entry.update({
+            'wait_p50_ms': _percentile(wait_ms, 0.5),
+            'wait_p95_ms': _percentile(wait_ms, 0.95),
+            'run_p50_ms': _percentile(run_ms, 0.5),
+            'run_p95_ms': _percentile(run_ms, 0.95)
+        })
+
+    return {
+        'depth': {status: depth.get(status, 0) for status in ('pending', 'running', 'done', 'failed')},
+        'oldest_due_seconds': round((now - oldest_due).total_seconds(), 1) if oldest_due else 0,
+        'window_hours': window_hours,
+        'jobs': per_job
+    }
+
+
+def prune_jobs(days):
+    """Delete finished jobs older than `days`, which also frees their idempotency keys."""
+    result = db.session.execute(
+        db.delete(Job).where(
+            Job.status.in_(('done', 'failed')), Job.finished_at < datetime.utcnow() - timedelta(days=days)
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,38 @@
+"""fotos as json
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:22:31.994203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite stores JSON as the same text it already holds, and a batch rebuild of
+    # solicitacoes would drop the FTS triggers, so only Postgres changes type.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column('solicitacoes', 'fotos',
+               existing_type=sa.TEXT(),
+               type_=postgresql.JSONB(none_as_null=True, astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using="NULLIF(fotos, '')::jsonb")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column('solicitacoes', 'fotos',
+               existing_type=postgresql.JSONB(none_as_null=True, astext_type=sa.Text()),
+               type_=sa.TEXT(),
+               existing_nullable=True,
+               postgresql_using='fotos::text')
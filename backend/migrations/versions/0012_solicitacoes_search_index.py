@@ -0,0 +1,30 @@
+"""solicitacoes search index
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 01:04:51.730129
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from search import search_backend
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Creating the FTS5 table also indexes the solicitacoes already stored; the Postgres GIN
+    # index is built over the existing rows
+    bind = op.get_bind()
+    search_backend(bind.dialect.name).setup(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    search_backend(bind.dialect.name).teardown(bind)
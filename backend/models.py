@@ -1,5 +1,12 @@
 from extensions import db
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import joinedload, column_property, deferred
+from serialization import Serializer
+from similarity import text_signature
+from uploads import photo_variants
+from geo import encode_geohash
 from datetime import datetime
+from operator import attrgetter
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -25,6 +32,16 @@ class User(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+def build_vereador_stats(total_assumidas, total_resolvidas, tempo_medio):
+    # Postgres returns the SQL averages as Decimal, which the JSON encoder writes as a string
+    total_assumidas, total_resolvidas, tempo_medio = int(total_assumidas), int(total_resolvidas), float(tempo_medio)
+    return {
+        'solicitacoes_assumidas': total_assumidas,
+        'solicitacoes_resolvidas': total_resolvidas,
+        'tempo_medio_resolucao': round(tempo_medio, 1),
+        'taxa_resolucao': round((total_resolvidas / total_assumidas * 100) if total_assumidas > 0 else 0, 0)
+    }
+
 class Vereador(db.Model):
     __tablename__ = 'vereadores'
     
@@ -34,6 +51,11 @@ class Vereador(db.Model):
     partido = db.Column(db.String(20), nullable=False)
     foto_url = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Maintained by ranking.py as solicitacoes change; `flask reconcile-vereador-counters` rebuilds them
+    total_assumidas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_resolvidas = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    tempo_resolucao_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    tempo_resolucao_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     solicitacoes = db.relationship('Solicitacao', backref='vereador', lazy=True, foreign_keys='Solicitacao.vereador_id')
@@ -41,19 +63,8 @@ class Vereador(db.Model):
     areas_atuacao = db.relationship('VereadorArea', backref='vereador', lazy=True)
     
     def calculate_stats(self):
-        total_assumidas = len([s for s in self.solicitacoes if s.vereador_id == self.id])
-        total_resolvidas = len([s for s in self.solicitacoes if s.status == 'resolvida'])
-        
-        # Calculate average resolution time
-        resolvidas_com_tempo = [s for s in self.solicitacoes if s.status == 'resolvida' and s.tempo_resolucao]
-        tempo_medio = sum([s.tempo_resolucao for s in resolvidas_com_tempo]) / len(resolvidas_com_tempo) if resolvidas_com_tempo else 0
-        
-        return {
-            'solicitacoes_assumidas': total_assumidas,
-            'solicitacoes_resolvidas': total_resolvidas,
-            'tempo_medio_resolucao': round(tempo_medio, 1),
-            'taxa_resolucao': round((total_resolvidas / total_assumidas * 100) if total_assumidas > 0 else 0, 0)
-        }
+        tempo_medio = self.tempo_resolucao_total / self.tempo_resolucao_count if self.tempo_resolucao_count else 0
+        return build_vereador_stats(self.total_assumidas or 0, self.total_resolvidas or 0, tempo_medio)
     
     def to_dict(self, include_stats=True):
         data = {
@@ -79,7 +90,7 @@ class Vereador(db.Model):
             ).group_by(
                 Categoria.nome
             ).order_by(
-                db.desc('count')
+                db.desc('count'), Categoria.nome
             ).limit(3).all()
             
             data['principais_areas'] = [{'area': area.nome, 'count': area.count} for area in areas]
@@ -118,6 +129,19 @@ class Bairro(db.Model):
 
 class Solicitacao(db.Model):
     __tablename__ = 'solicitacoes'
+    # Listings filter on one of these columns and page by (created_at, id) DESC
+    __table_args__ = (
+        db.Index('ix_solicitacoes_created_at_id', 'created_at', 'id'),
+        db.Index('ix_solicitacoes_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_solicitacoes_categoria_created_at', 'categoria_id', 'created_at', 'id'),
+        db.Index('ix_solicitacoes_bairro_created_at', 'bairro_id', 'created_at', 'id'),
+        db.Index('ix_solicitacoes_vereador_created_at', 'vereador_id', 'created_at', 'id'),
+        db.Index('ix_solicitacoes_user_id', 'user_id'),
+        # Covers the /api/vereadores/stats aggregate so it never reads the table
+        db.Index('ix_solicitacoes_vereador_stats', 'vereador_id', 'status', 'tempo_resolucao', 'user_id'),
+        # Map views: bbox/radius filters become prefix ranges on the geohash
+        db.Index('ix_solicitacoes_geohash', 'geohash'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(200), nullable=False)
@@ -128,14 +152,28 @@ class Solicitacao(db.Model):
     cep = db.Column(db.String(20))
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
-    fotos = db.Column(db.Text)  # JSON array as string
-    status = db.Column(db.String(20), nullable=False, default='aberta')  # aberta, em_andamento, resolvida
+    fotos = db.Column(db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql'))  # list of URLs
+    # active_history: the vereador counter hooks need the previous value even when it was never loaded
+    status = column_property(db.Column(db.String(20), nullable=False, default='aberta'), active_history=True)  # aberta, em_andamento, resolvida
     anonimo = db.Column(db.Boolean, default=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    vereador_id = db.Column(db.Integer, db.ForeignKey('vereadores.id'))
+    vereador_id = column_property(db.Column(db.Integer, db.ForeignKey('vereadores.id')), active_history=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    tempo_resolucao = db.Column(db.Integer)  # in days
+    tempo_resolucao = column_property(db.Column(db.Integer), active_history=True)  # in days
+    # Derived from latitude/longitude; a column default so bulk inserts get it too
+    geohash = db.Column(db.String(12), default=lambda context: encode_geohash(
+        context.get_current_parameters().get('latitude'),
+        context.get_current_parameters().get('longitude')
+    ))
+    # MinHash of titulo + descricao for duplicate detection (see duplicates.py), filled the same way.
+    # Deferred: only the duplicate lookup reads it
+    assinatura = deferred(db.Column(db.LargeBinary, default=lambda context: text_signature(
+        context.get_current_parameters().get('titulo'),
+        context.get_current_parameters().get('descricao')
+    )))
+    # Reports of the same problem merged into this one, see Apoio
+    total_apoios = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     def calculate_tempo_resolucao(self):
         if self.status == 'resolvida':
@@ -143,35 +181,146 @@ class Solicitacao(db.Model):
             return delta.days
         return None
     
-    def to_dict(self, include_user=False):
-        import json
+    # Serialized field -> column it is read from, used for `fields=` projections
+    FIELD_COLUMNS = {
+        'id': 'id',
+        'titulo': 'titulo',
+        'categoria': 'categoria_id',
+        'categoria_id': 'categoria_id',
+        'descricao': 'descricao',
+        'endereco': 'endereco',
+        'bairro': 'bairro_id',
+        'bairro_id': 'bairro_id',
+        'cep': 'cep',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+        'fotos': 'fotos',
+        'fotos_miniaturas': 'fotos',
+        'status': 'status',
+        'anonimo': 'anonimo',
+        'vereador_id': 'vereador_id',
+        'vereador_nome': 'vereador_id',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'tempo_resolucao': 'tempo_resolucao',
+        'apoios': 'total_apoios'
+    }
+    
+    @classmethod
+    def projection_columns(cls, fields):
+        # id and created_at are always loaded, the keyset cursor is built from them
+        names = {'id', 'created_at'} | {cls.FIELD_COLUMNS[field] for field in fields}
+        return [getattr(cls, name) for name in sorted(names)]
+    
+    # Serialized field -> relationship it reads through
+    FIELD_RELATIONSHIPS = {
+        'categoria': 'categoria',
+        'bairro': 'bairro',
+        'vereador_nome': 'vereador'
+    }
+    
+    @classmethod
+    def eager_options(cls, fields=None, include_user=False):
+        # Joins the related rows into the listing SELECT so to_dict never lazy loads per row
+        names = {
+            relationship for field, relationship in cls.FIELD_RELATIONSHIPS.items()
+            if fields is None or field in fields
+        }
+        if include_user:
+            names.add('usuario')
+        return [joinedload(getattr(cls, name)) for name in sorted(names)]
+    
+    @classmethod
+    def to_dict_many(cls, solicitacoes, fields=None, include_user=False):
+        if include_user:
+            return [sol.to_dict(include_user=True, fields=fields) for sol in solicitacoes]
+        return cls.SERIALIZER.many(solicitacoes, fields)
+    
+    def to_dict(self, include_user=False, fields=None):
+        data = self.SERIALIZER.one(self, fields)
         
-        data = {
+        if include_user and not self.anonimo:
+            data['usuario'] = self.usuario.to_dict()
+        
+        return data
+
+
+def _isoformat(name):
+    get = attrgetter(name)
+    return lambda obj: get(obj).isoformat()
+
+
+def _nome(relationship):
+    get = attrgetter(relationship)
+    return lambda obj: get(obj).nome if get(obj) else None
+
+
+# Same fields as FIELD_COLUMNS, in response order
+Solicitacao.SERIALIZER = Serializer({
+    'id': 'id',
+    'titulo': 'titulo',
+    'categoria': _nome('categoria'),
+    'categoria_id': 'categoria_id',
+    'descricao': 'descricao',
+    'endereco': 'endereco',
+    'bairro': _nome('bairro'),
+    'bairro_id': 'bairro_id',
+    'cep': 'cep',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'fotos': lambda sol: sol.fotos or [],
+    'fotos_miniaturas': lambda sol: [(photo_variants(url) or {}).get('thumb', url) for url in sol.fotos or ()],
+    'status': 'status',
+    'anonimo': 'anonimo',
+    'vereador_id': 'vereador_id',
+    'vereador_nome': _nome('vereador'),
+    'created_at': _isoformat('created_at'),
+    'updated_at': _isoformat('updated_at'),
+    'tempo_resolucao': 'tempo_resolucao',
+    'apoios': 'total_apoios'
+})
+
+@db.event.listens_for(Solicitacao, 'before_update')
+def _refresh_geohash(mapper, connection, target):
+    target.geohash = encode_geohash(target.latitude, target.longitude)
+
+@db.event.listens_for(Solicitacao, 'before_update')
+def _refresh_signature(mapper, connection, target):
+    state = db.inspect(target)
+    if state.attrs.titulo.history.has_changes() or state.attrs.descricao.history.has_changes():
+        target.assinatura = text_signature(target.titulo, target.descricao)
+
+class Apoio(db.Model):
+    __tablename__ = 'apoios'
+    __table_args__ = (
+        db.UniqueConstraint('solicitacao_id', 'user_id', name='uq_apoios_solicitacao_user'),
+    )
+    
+    # A report found to duplicate an open solicitacao, kept as support for it instead of a new row
+    id = db.Column(db.Integer, primary_key=True)
+    solicitacao_id = db.Column(db.Integer, db.ForeignKey('solicitacoes.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    titulo = db.Column(db.String(200), nullable=False)
+    descricao = db.Column(db.Text, nullable=False)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    fotos = db.Column(db.JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), 'postgresql'))
+    similaridade = db.Column(db.Float, nullable=False)
+    anonimo = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
             'id': self.id,
+            'solicitacao_id': self.solicitacao_id,
             'titulo': self.titulo,
-            'categoria': self.categoria.nome if self.categoria else None,
-            'categoria_id': self.categoria_id,
             'descricao': self.descricao,
-            'endereco': self.endereco,
-            'bairro': self.bairro.nome if self.bairro else None,
-            'bairro_id': self.bairro_id,
-            'cep': self.cep,
             'latitude': self.latitude,
             'longitude': self.longitude,
-            'fotos': json.loads(self.fotos) if self.fotos else [],
-            'status': self.status,
-            'anonimo': self.anonimo,
-            'vereador_id': self.vereador_id,
-            'vereador_nome': self.vereador.nome if self.vereador else None,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'tempo_resolucao': self.tempo_resolucao
+            'fotos': self.fotos or [],
+            'similaridade': round(self.similaridade, 2),
+            'created_at': self.created_at.isoformat()
         }
-        
-        if include_user and not self.anonimo:
-            data['usuario'] = self.usuario.to_dict()
-        
-        return data
 
 class VereadorArea(db.Model):
     __tablename__ = 'vereador_areas'
@@ -181,3 +330,118 @@ class VereadorArea(db.Model):
     categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False)
     
     categoria = db.relationship('Categoria', backref='vereador_areas', lazy=True)
+
+class SolicitacaoRollup(db.Model):
+    __tablename__ = 'solicitacao_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('vereador_id', 'categoria_id', 'status', 'dia'),
+        db.Index('ix_solicitacao_rollups_dia', 'dia'),
+    )
+    
+    # Daily counts per vereador x categoria x status, bucketed by Solicitacao.created_at
+    id = db.Column(db.Integer, primary_key=True)
+    vereador_id = db.Column(db.Integer, db.ForeignKey('vereadores.id'), nullable=False)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    dia = db.Column(db.Date, nullable=False)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    tempo_resolucao_total = db.Column(db.Integer, nullable=False, default=0)
+    tempo_resolucao_count = db.Column(db.Integer, nullable=False, default=0)
+
+class AnalyticsBucket(db.Model):
+    __tablename__ = 'analytics_buckets'
+    __table_args__ = (
+        db.UniqueConstraint('dia', 'bairro_id', 'categoria_id'),
+    )
+    
+    # Lower bounds, in days, of the tempo_resolucao histogram columns below; the last bin is open-ended
+    TEMPO_BINS = (0, 1, 2, 3, 4, 5, 7, 10, 14, 21, 30, 45, 60, 90, 180)
+    
+    # Daily counts per bairro x categoria, maintained by the hooks in analytics.py. Opened requests
+    # count on their creation day, resolved ones on creation day + tempo_resolucao
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False)
+    bairro_id = db.Column(db.Integer, nullable=False)  # 0 = no bairro
+    categoria_id = db.Column(db.Integer, nullable=False)
+    abertas = db.Column(db.Integer, nullable=False, default=0)
+    resolvidas = db.Column(db.Integer, nullable=False, default=0)
+    tempo_resolucao_total = db.Column(db.Integer, nullable=False, default=0)
+    tempo_resolucao_count = db.Column(db.Integer, nullable=False, default=0)
+    tempo_0 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_1 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_2 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_3 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_4 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_5 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_7 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_10 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_14 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_21 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_30 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_45 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_60 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_90 = db.Column(db.Integer, nullable=False, default=0)
+    tempo_180 = db.Column(db.Integer, nullable=False, default=0)
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    
+    # Write counter per table for the HTTP cache validators, see http_cache.py
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class SolicitacaoChange(db.Model):
+    __tablename__ = 'solicitacao_changes'
+    __table_args__ = (
+        db.Index('ix_solicitacao_changes_solicitacao_id', 'solicitacao_id', 'id'),
+    )
+    
+    # Append-only change feed: one row per create/update, read in id order
+    id = db.Column(db.Integer, primary_key=True)
+    solicitacao_id = db.Column(db.Integer, db.ForeignKey('solicitacoes.id'), nullable=False)
+    acao = db.Column(db.String(20), nullable=False)  # criada, atualizada, apoiada
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'solicitacao_id': self.solicitacao_id,
+            'acao': self.acao,
+            'status': self.status,
+            'created_at': self.created_at.isoformat()
+        }
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at', 'id'),
+    )
+    
+    # Background work queue, see jobs.py. Rows become visible to workers when the enqueuing transaction commits
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    idempotency_key = db.Column(db.String(200), unique=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(100))
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'run_at': self.run_at.isoformat(),
+            'created_at': self.created_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -0,0 +1,40 @@
+import base64
+import json
+from datetime import datetime
+
+from extensions import db
+
+
+def encode_cursor(created_at, id):
+    payload = json.dumps([created_at.isoformat(), id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_page(query, model, page_size, cursor=None):
+    """Return one page of `query` ordered by (created_at, id) DESC plus the cursor for the next one."""
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        query = query.filter(
+            db.or_(
+                model.created_at < created_at,
+                db.and_(model.created_at == created_at, model.id < id)
+            )
+        )
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(page_size + 1).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt as _bcrypt
+
+_lock = threading.Lock()
+_pool = None
+
+
+def _hash(password, rounds):
+    return _bcrypt.hashpw(password, _bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _check(password_hash, password):
+    return _bcrypt.checkpw(password, password_hash)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded process pool so a burst of logins can't take every request thread's CPU.
+
+    With PASSWORD_HASH_WORKERS = 0 hashing runs inline, which is handy for scripts and debugging.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 0
+        self.rounds = 12
+        self.timeout = 30
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.rounds = app.config['BCRYPT_LOG_ROUNDS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        global _pool
+        with _lock:
+            # Created lazily so every gunicorn worker forks its own pool
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=self.workers)
+        return _pool.submit(fn, *args).result(timeout=self.timeout)
+
+    def generate_password_hash(self, password):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        return self._run(_hash, password.encode('utf-8'), self.rounds)
+
+    def check_password_hash(self, password_hash, password):
+        if not password_hash or not password:
+            return False
+        return self._run(_check, password_hash.encode('utf-8'), password.encode('utf-8'))
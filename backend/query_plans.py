@@ -0,0 +1,84 @@
+import re
+
+import click
+from sqlalchemy import event
+
+from extensions import db
+
+# Read endpoints whose SQL must be served from an index
+CHECKED_URLS = [
+    '/api/solicitacoes',
+    '/api/solicitacoes?status=aberta',
+    '/api/solicitacoes?categoria=Iluminação',
+    '/api/solicitacoes?bairro=Centro',
+    '/api/solicitacoes?vereador_id=1',
+    '/api/solicitacoes?search=iluminacao',
+    '/api/solicitacoes?bbox=-46.7,-23.6,-46.6,-23.5',
+    '/api/solicitacoes?near=-23.55,-46.63&radius=1000',
+    '/api/solicitacoes/clusters?zoom=12&bbox=-46.7,-23.6,-46.6,-23.5',
+    '/api/solicitacoes/recent',
+    '/api/solicitacoes/changes?since=0',
+    '/api/solicitacoes/changes?since=0&solicitacao_id=1',
+    '/api/solicitacoes/1',
+    '/api/solicitacoes/1/apoios',
+    '/api/vereadores',
+    '/api/vereadores?ranking=mes',
+    '/api/vereadores/1',
+    '/api/vereadores/1/solicitacoes',
+    '/api/vereadores/1/solicitacoes?status=resolvida',
+    '/api/vereadores/stats',
+    '/api/analytics/timeseries?group_by=bairro,categoria&from=2020-01-01&interval=mes'
+]
+CHECKED_TABLES = {'solicitacoes', 'solicitacao_rollups', 'analytics_buckets', 'apoios'}
+
+# "SCAN solicitacoes" (or "SCAN TABLE solicitacoes" on older SQLite) without USING ... INDEX
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+def capture_statements(app, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        app.test_client().get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def full_scans(app, url):
+    scans = []
+    with app.app_context():
+        for statement, parameters in capture_statements(app, url):
+            plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+            for row in plan:
+                match = FULL_SCAN.search(row[-1])
+                if match and match.group(1) in CHECKED_TABLES:
+                    scans.append((statement, row[-1]))
+    return scans
+
+
+def register_query_plan_command(app):
+    @app.cli.command('check-query-plans')
+    def check_query_plans():
+        """Fail if any read endpoint's SQL falls back to a full table scan (SQLite only)."""
+        with app.app_context():
+            if db.engine.dialect.name != 'sqlite':
+                raise click.ClickException('check-query-plans needs a SQLite database')
+
+        failed = False
+        for url in CHECKED_URLS:
+            scans = full_scans(app, url)
+            click.echo(f"{'FAIL' if scans else 'ok  '} {url}")
+            for statement, detail in scans:
+                failed = True
+                click.echo(f'    {detail}\n    {" ".join(statement.split())}')
+
+        if failed:
+            raise SystemExit(1)
@@ -0,0 +1,312 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import Vereador, Solicitacao, Categoria, SolicitacaoRollup, build_vereador_stats
+
+# ranking= window -> how far back it looks; geral reads the vereador counters
+RANKING_WINDOWS = {
+    'geral': None,
+    'semestre': timedelta(days=182),
+    'mes': timedelta(days=30)
+}
+
+
+def rollup_snapshot(solicitacao):
+    """The rollup bucket a solicitacao currently counts towards, or None if no vereador assumed it."""
+    if solicitacao.vereador_id is None:
+        return None
+    tempo = solicitacao.tempo_resolucao if solicitacao.status == 'resolvida' else None
+    return (
+        int(solicitacao.vereador_id),
+        int(solicitacao.categoria_id),
+        solicitacao.status,
+        solicitacao.created_at.date(),
+        tempo or None
+    )
+
+
+def _apply_rollup(snapshot, delta):
+    vereador_id, categoria_id, status, dia, tempo = snapshot
+    table = SolicitacaoRollup.__table__
+    connection = db.session.connection()
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    insert = dialect.insert(table).values(
+        vereador_id=vereador_id, categoria_id=categoria_id, status=status, dia=dia,
+        total=delta,
+        tempo_resolucao_total=tempo * delta if tempo else 0,
+        tempo_resolucao_count=delta if tempo else 0
+    )
+    # Relative upsert, so concurrent writers add up instead of overwriting each other
+    connection.execute(insert.on_conflict_do_update(
+        index_elements=['vereador_id', 'categoria_id', 'status', 'dia'],
+        set_={
+            column: table.c[column] + insert.excluded[column]
+            for column in ('total', 'tempo_resolucao_total', 'tempo_resolucao_count')
+        }
+    ))
+
+
+def update_rollup(before, after):
+    """Move a solicitacao between rollup buckets; call inside the transaction that changes it."""
+    if before == after:
+        return
+    if before is not None:
+        _apply_rollup(before, -1)
+    if after is not None:
+        _apply_rollup(after, 1)
+
+
+def add_rollups(snapshots):
+    """Count many new solicitacoes at once, one rollup write per distinct bucket."""
+    for snapshot, count in Counter(s for s in snapshots if s is not None).items():
+        _apply_rollup(snapshot, count)
+
+
+def rebuild_rollups():
+    """Recompute every rollup bucket from solicitacoes with one INSERT .. SELECT; returns the bucket count."""
+    SolicitacaoRollup.query.delete()
+    # Same rule as rollup_snapshot: only resolved rows with a non-zero time carry a tempo
+    com_tempo = db.and_(Solicitacao.status == 'resolvida', Solicitacao.tempo_resolucao != 0)
+    dia = db.func.date(Solicitacao.created_at)
+    db.session.execute(db.insert(SolicitacaoRollup).from_select(
+        ['vereador_id', 'categoria_id', 'status', 'dia', 'total', 'tempo_resolucao_total', 'tempo_resolucao_count'],
+        db.select(
+            Solicitacao.vereador_id,
+            Solicitacao.categoria_id,
+            Solicitacao.status,
+            dia,
+            db.func.count(Solicitacao.id),
+            db.func.sum(db.case((com_tempo, Solicitacao.tempo_resolucao), else_=0)),
+            db.func.sum(db.case((com_tempo, 1), else_=0))
+        ).where(
+            Solicitacao.vereador_id.isnot(None)
+        ).group_by(
+            Solicitacao.vereador_id, Solicitacao.categoria_id, Solicitacao.status, dia
+        )
+    ))
+    db.session.commit()
+    return SolicitacaoRollup.query.count()
+
+
+def counter_snapshot(vereador_id, status, tempo_resolucao):
+    """What one solicitacao adds to its vereador's counters, or None if no vereador assumed it."""
+    if vereador_id is None:
+        return None
+    resolvida = status == 'resolvida'
+    # Same rule as the averages below: resolved rows with a non-zero time
+    tempo = tempo_resolucao if resolvida and tempo_resolucao else 0
+    return int(vereador_id), int(resolvida), tempo, int(bool(tempo))
+
+
+def _apply_counters(connection, snapshots, delta):
+    totals = {}
+    for snapshot in snapshots:
+        if snapshot is None:
+            continue
+        vereador_id, resolvidas, tempo, tempo_count = snapshot
+        current = totals.setdefault(vereador_id, [0, 0, 0, 0])
+        for index, value in enumerate((1, resolvidas, tempo, tempo_count)):
+            current[index] += value * delta
+    vereadores = Vereador.__table__
+    for vereador_id, (assumidas, resolvidas, tempo, tempo_count) in totals.items():
+        # Relative updates, so concurrent writers never overwrite each other's increments
+        connection.execute(vereadores.update().where(vereadores.c.id == vereador_id).values(
+            total_assumidas=vereadores.c.total_assumidas + assumidas,
+            total_resolvidas=vereadores.c.total_resolvidas + resolvidas,
+            tempo_resolucao_total=vereadores.c.tempo_resolucao_total + tempo,
+            tempo_resolucao_count=vereadores.c.tempo_resolucao_count + tempo_count
+        ))
+
+
+def add_counters(rows):
+    """Count bulk-inserted rows, which bypass the mapper hooks below."""
+    _apply_counters(db.session.connection(), (
+        counter_snapshot(row.get('vereador_id'), row.get('status'), row.get('tempo_resolucao')) for row in rows
+    ), 1)
+
+
+def previous_value(target, attribute):
+    """Value of `attribute` before the change being flushed."""
+    history = db.inspect(target).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return None if history.added else getattr(target, attribute)
+
+
+@db.event.listens_for(Solicitacao, 'after_insert')
+def _count_insert(mapper, connection, target):
+    _apply_counters(connection, [counter_snapshot(target.vereador_id, target.status, target.tempo_resolucao)], 1)
+
+
+@db.event.listens_for(Solicitacao, 'after_update')
+def _count_update(mapper, connection, target):
+    before = counter_snapshot(*(previous_value(target, name) for name in ('vereador_id', 'status', 'tempo_resolucao')))
+    after = counter_snapshot(target.vereador_id, target.status, target.tempo_resolucao)
+    if before != after:
+        _apply_counters(connection, [before], -1)
+        _apply_counters(connection, [after], 1)
+
+
+@db.event.listens_for(Solicitacao, 'after_delete')
+def _count_delete(mapper, connection, target):
+    _apply_counters(connection, [counter_snapshot(target.vereador_id, target.status, target.tempo_resolucao)], -1)
+
+
+def reconcile_counters(fix=True):
+    """Recompute every vereador's counters from solicitacoes; returns {vereador_id: (stored, actual)} for drifted ones."""
+    resolvida = Solicitacao.status == 'resolvida'
+    com_tempo = db.and_(resolvida, Solicitacao.tempo_resolucao != 0)
+    actual = {
+        vereador_id: (assumidas, resolvidas or 0, tempo or 0, tempo_count or 0)
+        for vereador_id, assumidas, resolvidas, tempo, tempo_count in db.session.query(
+            Solicitacao.vereador_id,
+            db.func.count(Solicitacao.id),
+            db.func.sum(db.case((resolvida, 1), else_=0)),
+            db.func.sum(db.case((com_tempo, Solicitacao.tempo_resolucao), else_=0)),
+            db.func.sum(db.case((com_tempo, 1), else_=0))
+        ).filter(
+            Solicitacao.vereador_id.isnot(None)
+        ).group_by(Solicitacao.vereador_id)
+    }
+
+    drift = {}
+    for vereador in Vereador.query.order_by(Vereador.id):
+        stored = (
+            vereador.total_assumidas, vereador.total_resolvidas,
+            vereador.tempo_resolucao_total, vereador.tempo_resolucao_count
+        )
+        expected = actual.get(vereador.id, (0, 0, 0, 0))
+        if stored != expected:
+            drift[vereador.id] = (stored, expected)
+            if fix:
+                (vereador.total_assumidas, vereador.total_resolvidas,
+                 vereador.tempo_resolucao_total, vereador.tempo_resolucao_count) = expected
+    if fix:
+        db.session.commit()
+    return drift
+
+
+def _counter_totals_subquery(vereador_id=None):
+    query = db.session.query(
+        Vereador.id.label('vereador_id'),
+        Vereador.total_assumidas.label('assumidas'),
+        Vereador.total_resolvidas.label('resolvidas'),
+        db.case(
+            (Vereador.tempo_resolucao_count > 0, Vereador.tempo_resolucao_total * 1.0 / Vereador.tempo_resolucao_count)
+        ).label('tempo_medio')
+    )
+    if vereador_id is not None:
+        query = query.filter(Vereador.id == vereador_id)
+    return query.subquery()
+
+
+def _vereador_filter(column, vereador_id):
+    # Filtering inside the subqueries keeps a single-vereador lookup on the vereador indexes
+    return column.isnot(None) if vereador_id is None else column == vereador_id
+
+
+def _areas_subquery(vereador_id=None):
+    count = db.func.count(Solicitacao.id)
+    return db.session.query(
+        Solicitacao.vereador_id.label('vereador_id'),
+        Categoria.nome.label('area'),
+        count.label('count'),
+        db.func.row_number().over(
+            partition_by=Solicitacao.vereador_id,
+            order_by=(count.desc(), Categoria.nome)
+        ).label('posicao')
+    ).join(
+        Categoria, Solicitacao.categoria_id == Categoria.id
+    ).filter(
+        _vereador_filter(Solicitacao.vereador_id, vereador_id)
+    ).group_by(
+        Solicitacao.vereador_id, Categoria.nome
+    ).subquery()
+
+
+def _rollup_totals_subquery(desde, vereador_id=None):
+    resolvida = SolicitacaoRollup.status == 'resolvida'
+    tempo_count = db.func.sum(SolicitacaoRollup.tempo_resolucao_count)
+    return db.session.query(
+        SolicitacaoRollup.vereador_id.label('vereador_id'),
+        db.func.sum(SolicitacaoRollup.total).label('assumidas'),
+        db.func.sum(db.case((resolvida, SolicitacaoRollup.total), else_=0)).label('resolvidas'),
+        db.case(
+            (tempo_count > 0, db.func.sum(SolicitacaoRollup.tempo_resolucao_total) * 1.0 / tempo_count)
+        ).label('tempo_medio')
+    ).filter(
+        SolicitacaoRollup.dia >= desde, _vereador_filter(SolicitacaoRollup.vereador_id, vereador_id)
+    ).group_by(
+        SolicitacaoRollup.vereador_id
+    ).having(
+        db.func.sum(SolicitacaoRollup.total) > 0
+    ).subquery()
+
+
+def _rollup_areas_subquery(desde, vereador_id=None):
+    count = db.func.sum(SolicitacaoRollup.total)
+    return db.session.query(
+        SolicitacaoRollup.vereador_id.label('vereador_id'),
+        Categoria.nome.label('area'),
+        count.label('count'),
+        db.func.row_number().over(
+            partition_by=SolicitacaoRollup.vereador_id,
+            order_by=(count.desc(), Categoria.nome)
+        ).label('posicao')
+    ).join(
+        Categoria, SolicitacaoRollup.categoria_id == Categoria.id
+    ).filter(
+        SolicitacaoRollup.dia >= desde, _vereador_filter(SolicitacaoRollup.vereador_id, vereador_id)
+    ).group_by(
+        SolicitacaoRollup.vereador_id, Categoria.nome
+    ).having(
+        count > 0
+    ).subquery()
+
+
+def vereador_ranking(vereador_id=None, ranking='geral'):
+    """Serialize vereadores with stats and top-3 areas, best resolution rate first, in one query."""
+    janela = RANKING_WINDOWS[ranking]
+    if janela is None:
+        totals = _counter_totals_subquery(vereador_id)
+        areas = _areas_subquery(vereador_id)
+    else:
+        desde = (datetime.utcnow() - janela).date()
+        totals = _rollup_totals_subquery(desde, vereador_id)
+        areas = _rollup_areas_subquery(desde, vereador_id)
+
+    assumidas = db.func.coalesce(totals.c.assumidas, 0)
+    taxa = db.case((assumidas > 0, totals.c.resolvidas * 1.0 / assumidas), else_=0)
+
+    query = db.session.query(
+        Vereador,
+        totals.c.assumidas,
+        totals.c.resolvidas,
+        totals.c.tempo_medio,
+        areas.c.area,
+        areas.c.count
+    ).outerjoin(
+        totals, totals.c.vereador_id == Vereador.id
+    ).outerjoin(
+        areas, db.and_(areas.c.vereador_id == Vereador.id, areas.c.posicao <= 3)
+    )
+
+    if vereador_id is not None:
+        query = query.filter(Vereador.id == vereador_id)
+
+    rows = query.order_by(taxa.desc(), Vereador.id, areas.c.posicao).all()
+
+    ranking = {}
+    for vereador, total_assumidas, total_resolvidas, tempo_medio, area, count in rows:
+        if vereador.id not in ranking:
+            data = vereador.to_dict(include_stats=False)
+            data.update(build_vereador_stats(total_assumidas or 0, total_resolvidas or 0, tempo_medio or 0))
+            data['principais_areas'] = []
+            ranking[vereador.id] = data
+        if area is not None:
+            ranking[vereador.id]['principais_areas'].append({'area': area, 'count': count})
+
+    return list(ranking.values())
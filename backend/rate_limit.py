@@ -0,0 +1,33 @@
+import threading
+import time
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets: `capacity` attempts in a burst, refilled at `per_minute`."""
+
+    def __init__(self, capacity, per_minute, max_keys=100000):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        # Full buckets carry no state, so they can be dropped
+        for key, (tokens, updated_at) in list(self._buckets.items()):
+            if tokens + (now - updated_at) * self.rate >= self.capacity:
+                del self._buckets[key]
+
+    def consume(self, key):
+        """Take one token for `key`. Returns 0 if allowed, else seconds until the next token."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = (tokens - 1, now)
+            return 0
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from cache import clear_on_commit
+from extensions import db
+from models import Categoria, Bairro
+
+
+class ReferenceData:
+    """Process-local copy of the categorias and bairros tables.
+
+    Reloaded after a commit in this process writes them, and REFERENCE_DATA_TTL seconds after
+    loading, which is how writes made by other workers show up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = None
+        self._loaded_at = 0
+
+    def _load(self):
+        with self._lock:
+            if self._tables is not None and time.monotonic() - self._loaded_at > current_app.config['REFERENCE_DATA_TTL']:
+                self._tables = None
+            if self._tables is None:
+                tables = {}
+                for name, model in (('categorias', Categoria), ('bairros', Bairro)):
+                    rows = [row.to_dict() for row in model.query.order_by(model.id).all()]
+                    tables[name] = {
+                        'rows': rows,
+                        'ids': {row['nome']: row['id'] for row in rows},
+                        'known': {row['id'] for row in rows},
+                        'etag': hashlib.sha1(json.dumps(rows, sort_keys=True).encode('utf-8')).hexdigest()
+                    }
+                self._tables = tables
+                self._loaded_at = time.monotonic()
+            return self._tables
+
+    def clear(self):
+        with self._lock:
+            self._tables = None
+
+    def rows(self, table):
+        data = self._load()[table]
+        return data['rows'], data['etag']
+
+    def _lookup(self, table, model, nome):
+        id = self._load()[table]['ids'].get(nome)
+        if id is None:
+            # Another worker may have inserted it since we loaded
+            row = model.query.filter_by(nome=nome).first()
+            if row:
+                self.clear()
+                id = row.id
+        return id
+
+    def has_categoria(self, id):
+        if id in self._load()['categorias']['known']:
+            return True
+        if db.session.get(Categoria, id):
+            self.clear()
+            return True
+        return False
+
+    def categoria_id(self, nome):
+        return self._lookup('categorias', Categoria, nome)
+
+    def bairro_id(self, nome):
+        return self._lookup('bairros', Bairro, nome)
+
+    def get_or_create_bairro_id(self, nome):
+        bairro_id = self.bairro_id(nome)
+        if bairro_id is not None:
+            return bairro_id
+        try:
+            with db.session.begin_nested():
+                bairro = Bairro(nome=nome)
+                db.session.add(bairro)
+            return bairro.id
+        except IntegrityError:
+            # A concurrent request created it first
+            return Bairro.query.filter_by(nome=nome).one().id
+
+
+reference_data = ReferenceData()
+clear_on_commit(reference_data, Categoria, Bairro)
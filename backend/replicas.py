@@ -0,0 +1,67 @@
+import sqlite3
+import time
+
+import click
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+STICKY_COOKIE = 'primary_until'
+STICKY_HEADER = 'X-Primary-Until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(Session):
+    """Sends reads to the replica bind while the request allows it; flushes always go to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('read_replica'):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _sticky_until():
+    for value in (request.headers.get(STICKY_HEADER), request.cookies.get(STICKY_COOKIE)):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            continue
+    return 0
+
+
+def init_replica_routing(app):
+    """Route GET/HEAD handlers to SQLALCHEMY_BINDS['replica'] when one is configured."""
+    if REPLICA_BIND not in (app.config.get('SQLALCHEMY_BINDS') or {}):
+        return
+    sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+
+    @app.before_request
+    def _route_reads():
+        # Read-your-writes: a client that just wrote keeps reading the primary for a while
+        if request.method in SAFE_METHODS and _sticky_until() < time.time():
+            g.read_replica = True
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            until = str(int(time.time() + sticky_seconds) + 1)
+            response.headers[STICKY_HEADER] = until
+            response.set_cookie(STICKY_COOKIE, until, max_age=sticky_seconds + 1, httponly=True, samesite='Lax')
+        return response
+
+    @app.cli.command('sync-replica')
+    def sync_replica_command():
+        """Copy the primary SQLite database over the replica one (local stand-in for replication)."""
+        from extensions import db
+        primary, replica = db.engines[None], db.engines[REPLICA_BIND]
+        if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            raise click.ClickException('sync-replica only copies SQLite files; use real replication elsewhere')
+        source = sqlite3.connect(primary.url.database)
+        target = sqlite3.connect(replica.url.database)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+        click.echo(f'{primary.url.database} -> {replica.url.database}')
@@ -0,0 +1,160 @@
+import re
+
+from sqlalchemy import event
+
+from extensions import db
+from models import Solicitacao
+
+# External-content FTS5 index over solicitacoes, kept in sync by triggers.
+# remove_diacritics makes "iluminacao" match "Iluminação".
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS solicitacoes_fts USING fts5(
+        titulo, descricao, endereco,
+        content='solicitacoes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS solicitacoes_fts_ai AFTER INSERT ON solicitacoes BEGIN
+        INSERT INTO solicitacoes_fts(rowid, titulo, descricao, endereco)
+        VALUES (new.id, new.titulo, new.descricao, new.endereco);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS solicitacoes_fts_ad AFTER DELETE ON solicitacoes BEGIN
+        INSERT INTO solicitacoes_fts(solicitacoes_fts, rowid, titulo, descricao, endereco)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.endereco);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS solicitacoes_fts_au AFTER UPDATE OF titulo, descricao, endereco ON solicitacoes BEGIN
+        INSERT INTO solicitacoes_fts(solicitacoes_fts, rowid, titulo, descricao, endereco)
+        VALUES ('delete', old.id, old.titulo, old.descricao, old.endereco);
+        INSERT INTO solicitacoes_fts(rowid, titulo, descricao, endereco)
+        VALUES (new.id, new.titulo, new.descricao, new.endereco);
+    END
+    """
+]
+SQLITE_REBUILD = "INSERT INTO solicitacoes_fts(solicitacoes_fts) VALUES ('rebuild')"
+
+# Postgres keeps an expression GIN index; unaccent() is wrapped so it can be indexed
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_solicitacoes_busca ON solicitacoes USING GIN (
+        to_tsvector('portuguese', f_unaccent(concat_ws(' ', titulo, descricao, endereco)))
+    )
+    """
+]
+
+
+def search_terms(search):
+    return re.findall(r'\w+', search)
+
+
+class SqliteSearch:
+    fts = db.table('solicitacoes_fts', db.column('rowid'), db.column('rank'))
+
+    def setup(self, connection):
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = 'solicitacoes_fts'"
+        ).first()
+        for ddl in SQLITE_DDL:
+            connection.exec_driver_sql(ddl)
+        if not exists:
+            connection.exec_driver_sql(SQLITE_REBUILD)
+
+    def teardown(self, connection):
+        connection.exec_driver_sql("DROP TABLE IF EXISTS solicitacoes_fts")
+
+    def filter(self, query, search):
+        terms = search_terms(search)
+        if not terms:
+            return query
+        # Every term must match, as a prefix so search-as-you-type works
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return query.join(self.fts, self.fts.c.rowid == Solicitacao.id).filter(
+            db.literal_column('solicitacoes_fts').op('MATCH')(match)
+        )
+
+    def rank_order(self, search):
+        # FTS5 rank is bm25, lower is more relevant
+        return [self.fts.c.rank, Solicitacao.id.desc()]
+
+
+class PostgresSearch:
+    def setup(self, connection):
+        for ddl in POSTGRES_DDL:
+            connection.exec_driver_sql(ddl)
+
+    def teardown(self, connection):
+        pass
+
+    def _document(self):
+        return db.func.to_tsvector('portuguese', db.func.f_unaccent(
+            db.func.concat_ws(' ', Solicitacao.titulo, Solicitacao.descricao, Solicitacao.endereco)
+        ))
+
+    def _tsquery(self, search):
+        terms = ' & '.join(f'{term}:*' for term in search_terms(search))
+        return db.func.to_tsquery('portuguese', db.func.f_unaccent(terms))
+
+    def filter(self, query, search):
+        if not search_terms(search):
+            return query
+        return query.filter(self._document().op('@@')(self._tsquery(search)))
+
+    def rank_order(self, search):
+        return [db.func.ts_rank(self._document(), self._tsquery(search)).desc(), Solicitacao.id.desc()]
+
+
+class LikeSearch:
+    # Fallback for databases without a full-text index
+    def setup(self, connection):
+        pass
+
+    def teardown(self, connection):
+        pass
+
+    def filter(self, query, search):
+        search_pattern = f'%{search}%'
+        return query.filter(
+            db.or_(
+                Solicitacao.titulo.like(search_pattern),
+                Solicitacao.descricao.like(search_pattern),
+                Solicitacao.endereco.like(search_pattern)
+            )
+        )
+
+    def rank_order(self, search):
+        return [Solicitacao.created_at.desc(), Solicitacao.id.desc()]
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SqliteSearch,
+    'postgresql': PostgresSearch
+}
+
+
+def search_backend(dialect_name=None):
+    return SEARCH_BACKENDS.get(dialect_name or db.engine.dialect.name, LikeSearch)()
+
+
+def _after_create(target, connection, **kw):
+    search_backend(connection.dialect.name).setup(connection)
+
+
+def _before_drop(target, connection, **kw):
+    search_backend(connection.dialect.name).teardown(connection)
+
+
+def init_search(app):
+    """Create/drop the full-text index alongside db.create_all()/db.drop_all()."""
+    if not event.contains(db.metadata, 'after_create', _after_create):
+        event.listen(db.metadata, 'after_create', _after_create)
+        event.listen(db.metadata, 'before_drop', _before_drop)
@@ -1,18 +1,128 @@
-from extensions import db
+from extensions import db, passwords
 from models import User, Vereador, Categoria, Bairro, Solicitacao
-from flask_bcrypt import Bcrypt
+from ranking import rebuild_rollups, reconcile_counters
+from analytics import rebuild_analytics
+from flask_migrate import upgrade
+from sqlalchemy import text
 from datetime import datetime, timedelta
-import json
+import argparse
+import random
+import time
 
-bcrypt = Bcrypt()
+PARTIDOS = ['PSDB', 'PT', 'PMDB', 'PSB', 'PDT', 'PL', 'PSOL', 'PV', 'REDE', 'NOVO']
+RUAS = ['Rua das Flores', 'Avenida Brasil', 'Rua da Saúde', 'Praça Central', 'Rua XV de Novembro',
+        'Avenida Paulista', 'Rua do Comércio', 'Travessa da Paz', 'Rua São João', 'Estrada Velha']
+PROBLEMAS = {
+    1: ['Buraco na via', 'Asfalto cedendo', 'Calçada quebrada', 'Meio-fio destruído'],
+    2: ['Poste apagado', 'Lâmpada queimada', 'Iluminação deficiente', 'Fiação exposta'],
+    3: ['Falta de médicos', 'Posto de saúde fechado', 'Demora no atendimento', 'Falta de remédios'],
+    4: ['Escola sem professor', 'Telhado da escola com goteira', 'Falta de vagas na creche', 'Merenda atrasada'],
+    5: ['Esgoto a céu aberto', 'Vazamento de água', 'Bueiro entupido', 'Falta de água'],
+    6: ['Rua sem policiamento', 'Terreno abandonado', 'Câmera de segurança quebrada', 'Assaltos frequentes'],
+    7: ['Ônibus atrasado', 'Ponto de ônibus sem cobertura', 'Semáforo quebrado', 'Faixa de pedestre apagada'],
+    8: ['Árvore caída', 'Lixo acumulado', 'Queimada em terreno', 'Córrego poluído'],
+}
+STATUS_WEIGHTS = (('aberta', 0.35), ('em_andamento', 0.25), ('resolvida', 0.40))
+# Synthetic reports scatter around the same city centre as the fixed ones
+CENTRO = (-23.5505, -46.6333)
 
-def seed_database():
+
+def _synthetic_users(count, password_hash, tipo, prefix, rng, batch_size):
+    """Bulk-insert `count` users and return their ids."""
+    ids = []
+    for start in range(0, count, batch_size):
+        rows = [{
+            'email': f'{prefix}{n}@exemplo.com' if tipo == 'cidadao' else f'{prefix}{n}@camara.gov.br',
+            'password_hash': password_hash,
+            'nome': f'{prefix.capitalize()} {n}',
+            'tipo_usuario': tipo,
+            'telefone': f'(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}'
+        } for n in range(start + 1, min(start + batch_size, count) + 1)]
+        ids += [id for id, in db.session.execute(db.insert(User).returning(User.id), rows)]
+        db.session.commit()
+    return ids
+
+
+def _synthetic_solicitacao(rng, user_ids, vereador_ids, now):
+    categoria_id = rng.randint(1, len(PROBLEMAS))
+    rua = rng.choice(RUAS)
+    problema = rng.choice(PROBLEMAS[categoria_id])
+    status = rng.choices([s for s, _ in STATUS_WEIGHTS], [w for _, w in STATUS_WEIGHTS])[0]
+    created_at = now - timedelta(days=rng.uniform(0, 730))
+    tempo_resolucao = None
+    updated_at = created_at
+    if status == 'resolvida':
+        tempo_resolucao = rng.randint(0, 90)
+        updated_at = min(now, created_at + timedelta(days=tempo_resolucao, hours=rng.uniform(0, 23)))
+    # Open reports may still be unassigned; anything in progress has a vereador
+    assigned = status != 'aberta' or rng.random() < 0.3
+    return {
+        'titulo': f'{problema} na {rua}',
+        'categoria_id': categoria_id,
+        'descricao': f'{problema} próximo ao número {rng.randint(1, 2000)} da {rua}. Moradores pedem providências.',
+        'endereco': f'{rua}, {rng.randint(1, 2000)}',
+        'bairro_id': rng.randint(1, 6),
+        'cep': f'0{rng.randint(1000, 9999)}-{rng.randint(100, 999)}',
+        'latitude': round(CENTRO[0] + rng.gauss(0, 0.08), 6),
+        'longitude': round(CENTRO[1] + rng.gauss(0, 0.08), 6),
+        'fotos': ['/placeholder.svg?height=300&width=400'] if rng.random() < 0.4 else [],
+        'status': status,
+        'anonimo': rng.random() < 0.1,
+        'user_id': rng.choice(user_ids),
+        'vereador_id': rng.choice(vereador_ids) if assigned else None,
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'tempo_resolucao': tempo_resolucao
+    }
+
+
+def seed_synthetic(total_solicitacoes, total_vereadores, total_users, password_hash, seed=42, batch_size=5000):
+    """Top the fixed demo data up to the given totals with reproducible random rows, inserted in bulk."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    extra_users = max(0, total_users - User.query.filter_by(tipo_usuario='cidadao').count())
+    _synthetic_users(extra_users, password_hash, 'cidadao', 'cidadao', rng, batch_size)
+    print(f"Created {extra_users} synthetic citizens")
+
+    extra_vereadores = max(0, total_vereadores - Vereador.query.count())
+    vereador_user_ids = _synthetic_users(extra_vereadores, password_hash, 'vereador', 'vereador', rng, batch_size)
+    if vereador_user_ids:
+        db.session.execute(db.insert(Vereador), [{
+            'user_id': user_id,
+            'nome': f'Vereador {n}',
+            'partido': rng.choice(PARTIDOS),
+            'foto_url': '/placeholder.svg?height=100&width=100'
+        } for n, user_id in enumerate(vereador_user_ids, start=1)])
+        db.session.commit()
+    print(f"Created {extra_vereadores} synthetic vereadores")
+
+    user_ids = [id for id, in db.session.query(User.id).filter_by(tipo_usuario='cidadao')]
+    vereador_ids = [id for id, in db.session.query(Vereador.id)]
+    extra = max(0, total_solicitacoes - Solicitacao.query.count())
+    now = datetime.utcnow()
+    for start in range(0, extra, batch_size):
+        # Bulk path: column defaults (geohash) apply, mapper hooks do not; counters are rebuilt below
+        db.session.execute(db.insert(Solicitacao), [
+            _synthetic_solicitacao(rng, user_ids, vereador_ids, now)
+            for _ in range(min(batch_size, extra - start))
+        ])
+        db.session.commit()
+        print(f"  {min(start + batch_size, extra)}/{extra} synthetic requests")
+
+    reconcile_counters()
+    print(f"Synthetic data done in {time.perf_counter() - started:.1f}s")
+
+
+def seed_database(total_solicitacoes=0, total_vereadores=0, total_users=0, seed=42, batch_size=5000):
     from app import app
     
     with app.app_context():
        
         db.drop_all()
-        db.create_all()
+        db.session.execute(text('DROP TABLE IF EXISTS alembic_version'))
+        db.session.commit()
+        upgrade()
         
         print("Seeding database...")
         
@@ -45,7 +155,7 @@ def seed_database():
         print(f"Created {len(bairros)} neighborhoods")
         
     
-        password_hash = bcrypt.generate_password_hash('senha123').decode('utf-8')
+        password_hash = passwords.generate_password_hash('senha123')
         
         cidadao1 = User(
             email='joao@email.com',
@@ -105,7 +215,7 @@ def seed_database():
         print(f"Created {len(vereadores)} vereadores")
         
     
-        solicitacoes = [
+        fixed_solicitacoes = [
             Solicitacao(
                 titulo='Buraco na Rua das Flores',
                 categoria_id=1,
@@ -115,7 +225,7 @@ def seed_database():
                 cep='01234-567',
                 latitude=-23.5505,
                 longitude=-46.6333,
-                fotos=json.dumps(['/placeholder.svg?height=300&width=400']),
+                fotos=['/placeholder.svg?height=300&width=400'],
                 status='aberta',
                 anonimo=False,
                 user_id=cidadao1.id,
@@ -130,7 +240,7 @@ def seed_database():
                 cep='01234-567',
                 latitude=-23.5515,
                 longitude=-46.6343,
-                fotos=json.dumps(['/placeholder.svg?height=300&width=400']),
+                fotos=['/placeholder.svg?height=300&width=400'],
                 status='em_andamento',
                 anonimo=False,
                 user_id=cidadao2.id,
@@ -146,7 +256,7 @@ def seed_database():
                 cep='02345-678',
                 latitude=-23.5525,
                 longitude=-46.6353,
-                fotos=json.dumps([]),
+                fotos=[],
                 status='resolvida',
                 anonimo=False,
                 user_id=cidadao1.id,
@@ -172,11 +282,18 @@ def seed_database():
                 created_at=datetime.utcnow() - timedelta(days=60-i),
                 tempo_resolucao=(10 + i) if i % 3 == 2 else None
             )
-            solicitacoes.append(sol)
+            fixed_solicitacoes.append(sol)
         
-        db.session.add_all(solicitacoes)
+        db.session.add_all(fixed_solicitacoes)
         db.session.commit()
-        print(f"Created {len(solicitacoes)} requests")
+        print(f"Created {len(fixed_solicitacoes)} requests")
+        
+        seed_synthetic(total_solicitacoes, total_vereadores, total_users, password_hash, seed=seed, batch_size=batch_size)
+        
+        rebuild_rollups()
+        print("Built ranking rollups")
+        rebuild_analytics()
+        print("Built analytics buckets")
         
         print("\nDatabase seeded successfully!")
         print("\nTest credentials:")
@@ -184,4 +301,12 @@ def seed_database():
         print("Vereador: carlos.lima@camara.gov.br / senha123")
 
 if __name__ == '__main__':
-    seed_database()
+    parser = argparse.ArgumentParser(description='Reset the database with demo data, optionally scaled up.')
+    parser.add_argument('--solicitacoes', type=int, default=0,
+                        help='Total solicitações, e.g. 1_000_000 (default: only the fixed demo rows)')
+    parser.add_argument('--vereadores', type=int, default=0, help='Total vereadores')
+    parser.add_argument('--users', type=int, default=0, help='Total citizen users')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed, so runs are reproducible')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+    seed_database(args.solicitacoes, args.vereadores, args.users, args.seed, args.batch_size)
@@ -0,0 +1,86 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, without it the stdlib encoder is used
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps_bytes(obj):
+    """Compact UTF-8 JSON; dates as ISO 8601."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """app.json provider: jsonify() and request.get_json() through dumps_bytes()/loads()."""
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return json.dumps(obj, default=_default, **kwargs)
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype='application/json')
+
+
+class Serializer:
+    """Builds dicts from a schema of field -> attribute name or function(obj), in schema order.
+
+    The getters of each `fields` projection are resolved once and cached, so serializing a row
+    is one call per field.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._plan = lru_cache(maxsize=256)(self._build_plan)
+
+    def _build_plan(self, fields):
+        names = tuple(name for name in self.schema if fields is None or name in fields)
+        getters = tuple(
+            attrgetter(getter) if isinstance(getter, str) else getter
+            for getter in (self.schema[name] for name in names)
+        )
+        return names, getters
+
+    def plan(self, fields=None):
+        return self._plan(None if fields is None else frozenset(fields))
+
+    def one(self, obj, fields=None):
+        names, getters = self.plan(fields)
+        return dict(zip(names, [get(obj) for get in getters]))
+
+    def many(self, objs, fields=None):
+        names, getters = self.plan(fields)
+        return [dict(zip(names, [get(obj) for get in getters])) for obj in objs]
@@ -0,0 +1,45 @@
+import re
+import struct
+import unicodedata
+import zlib
+
+SHINGLE_SIZE = 4
+# Bottom-k MinHash: the k smallest shingle hashes. 32 values = 128 bytes per row
+SIGNATURE_SIZE = 32
+
+
+def normalize(text):
+    """Lowercase, no accents, words separated by single spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def shingles(text):
+    text = normalize(text)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def text_signature(*texts):
+    """MinHash signature of the texts' character shingles as bytes, or None for empty text."""
+    hashes = sorted({zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(' '.join(t or '' for t in texts))})
+    if not hashes:
+        return None
+    hashes = hashes[:SIGNATURE_SIZE]
+    return struct.pack(f'<{len(hashes)}I', *hashes)
+
+
+def _values(signature):
+    return struct.unpack(f'<{len(signature) // 4}I', signature)
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures (exact for short texts)."""
+    if not a or not b:
+        return 0.0
+    a, b = set(_values(a)), set(_values(b))
+    # The k smallest hashes of the union are a sample of it; count how many of them both sides have
+    union = sorted(a | b)[:SIGNATURE_SIZE]
+    return sum(1 for value in union if value in a and value in b) / len(union)
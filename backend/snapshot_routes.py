@@ -0,0 +1,53 @@
+import os
+
+import click
+from flask import jsonify, send_from_directory
+from werkzeug.utils import secure_filename
+from extensions import db
+from jobs import schedule_snapshot
+from snapshots import PARQUET_MIMETYPE, MANIFEST, latest_manifest, write_snapshot
+
+def register_snapshot_routes(app):
+    def export_folder():
+        return os.path.abspath(app.config['EXPORT_FOLDER'])
+
+    # Both endpoints read files only, never the database
+    @app.route('/api/exports/solicitacoes', methods=['GET'])
+    def get_solicitacoes_snapshot():
+        try:
+            manifest = latest_manifest(export_folder())
+            if manifest is None:
+                return jsonify({'error': 'No snapshot available yet'}), 404
+            
+            for entry in manifest['arquivos']:
+                entry['url'] = f"/api/exports/solicitacoes/{manifest['snapshot']}/{entry['arquivo']}"
+            response = jsonify(manifest)
+            response.headers['Cache-Control'] = 'public, max-age=300'
+            return response, 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/exports/solicitacoes/<snapshot>/<filename>', methods=['GET'])
+    def download_solicitacoes_snapshot(snapshot, filename):
+        snapshot, filename = secure_filename(snapshot), secure_filename(filename)
+        folder = os.path.join(export_folder(), snapshot)
+        if not filename.endswith('.parquet') or not os.path.exists(os.path.join(folder, MANIFEST)):
+            return jsonify({'error': 'File not found'}), 404
+        # conditional=True (the default) answers Range requests with 206 partial content
+        response = send_from_directory(folder, filename, mimetype=PARQUET_MIMETYPE, max_age=31536000)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+    @app.cli.command('export-snapshot')
+    def export_snapshot_command():
+        """Write a Parquet snapshot of solicitacoes now."""
+        manifest = write_snapshot(export_folder(), app.config['SNAPSHOT_BATCH_SIZE'], app.config['SNAPSHOT_KEEP'])
+        click.echo(f"{manifest['snapshot']}: {manifest['linhas']} rows in {len(manifest['arquivos'])} file(s)")
+
+    @app.cli.command('schedule-snapshots')
+    def schedule_snapshots_command():
+        """Start the periodic snapshot job; run-jobs workers then keep it going."""
+        job_id = schedule_snapshot()
+        db.session.commit()
+        click.echo(f'snapshot job {job_id} scheduled' if job_id else 'next snapshot already scheduled')
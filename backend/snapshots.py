@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+from datetime import datetime
+from itertools import groupby
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional, without it no snapshots can be written
+    pa = None
+
+from extensions import db
+from models import Solicitacao, Categoria, Bairro, Vereador
+
+MANIFEST = 'manifest.json'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+
+def _schema():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('titulo', pa.string()),
+        ('descricao', pa.string()),
+        ('categoria_id', pa.int32()),
+        ('categoria', pa.string()),
+        ('bairro_id', pa.int32()),
+        ('bairro', pa.string()),
+        ('endereco', pa.string()),
+        ('cep', pa.string()),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('status', pa.string()),
+        ('anonimo', pa.bool_()),
+        ('vereador_id', pa.int32()),
+        ('vereador', pa.string()),
+        ('partido', pa.string()),
+        ('fotos', pa.list_(pa.string())),
+        ('created_at', pa.timestamp('us')),
+        ('updated_at', pa.timestamp('us')),
+        ('tempo_resolucao', pa.int32())
+    ])
+
+
+def _select():
+    # Same columns and order as _schema(); nothing about the citizen who filed the request
+    return db.select(
+        Solicitacao.id, Solicitacao.titulo, Solicitacao.descricao,
+        Solicitacao.categoria_id, Categoria.nome,
+        Solicitacao.bairro_id, Bairro.nome,
+        Solicitacao.endereco, Solicitacao.cep, Solicitacao.latitude, Solicitacao.longitude,
+        Solicitacao.status, Solicitacao.anonimo,
+        Solicitacao.vereador_id, Vereador.nome, Vereador.partido,
+        Solicitacao.fotos, Solicitacao.created_at, Solicitacao.updated_at, Solicitacao.tempo_resolucao
+    ).select_from(Solicitacao).outerjoin(
+        Categoria, Categoria.id == Solicitacao.categoria_id
+    ).outerjoin(
+        Bairro, Bairro.id == Solicitacao.bairro_id
+    ).outerjoin(
+        Vereador, Vereador.id == Solicitacao.vereador_id
+    ).order_by(Solicitacao.created_at, Solicitacao.id)
+
+
+def _table(rows, schema):
+    columns = [list(column) for column in zip(*rows)]
+    fotos = schema.get_field_index('fotos')
+    columns[fotos] = [value or [] for value in columns[fotos]]
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+    )
+
+
+def _month(row):
+    return row.created_at.strftime('%Y-%m') if row.created_at else 'sem-data'
+
+
+def write_snapshot(folder, batch_size=50000, keep=3):
+    """Write every solicitacao to one Parquet file per creation month in a new folder/<snapshot id>/.
+
+    Reads in batches of `batch_size` rows inside one read transaction, so the files are a consistent
+    picture of the database. The folder only appears once complete; all but the newest `keep` are removed.
+    """
+    if pa is None:
+        raise RuntimeError('pyarrow is required for snapshots (pip install pyarrow)')
+    snapshot_id = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    target = os.path.join(folder, snapshot_id)
+    tmp = f'{target}.part'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    schema = _schema()
+    files = []
+    writer = None
+    try:
+        result = db.session.execute(_select().execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            # Rows come in created_at order, so each month is one contiguous run
+            for month, chunk in groupby(rows, key=_month):
+                if not files or files[-1]['mes'] != month:
+                    if writer:
+                        writer.close()
+                    filename = f'solicitacoes_{month}.parquet'
+                    writer = pq.ParquetWriter(os.path.join(tmp, filename), schema, compression='zstd')
+                    files.append({'mes': month, 'arquivo': filename, 'linhas': 0})
+                chunk = list(chunk)
+                writer.write_table(_table(chunk, schema))
+                files[-1]['linhas'] += len(chunk)
+        if writer:
+            writer.close()
+            writer = None
+    except BaseException:
+        if writer:
+            writer.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    finally:
+        # Ends the read transaction
+        db.session.rollback()
+
+    for entry in files:
+        entry['bytes'] = os.path.getsize(os.path.join(tmp, entry['arquivo']))
+    manifest = {
+        'snapshot': snapshot_id,
+        'generated_at': datetime.utcnow().isoformat(),
+        'linhas': sum(entry['linhas'] for entry in files),
+        'formato': 'parquet',
+        'schema': [{'nome': field.name, 'tipo': str(field.type)} for field in schema],
+        'arquivos': files
+    }
+    with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, target)
+
+    for old in list_snapshots(folder)[keep:]:
+        shutil.rmtree(os.path.join(folder, old), ignore_errors=True)
+    return manifest
+
+
+def list_snapshots(folder):
+    """Complete snapshot ids, newest first."""
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        (name for name in os.listdir(folder) if os.path.exists(os.path.join(folder, name, MANIFEST))),
+        reverse=True
+    )
+
+
+def latest_manifest(folder):
+    snapshots = list_snapshots(folder)
+    if not snapshots:
+        return None
+    with open(os.path.join(folder, snapshots[0], MANIFEST), encoding='utf-8') as f:
+        return json.load(f)
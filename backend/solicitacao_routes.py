@@ -1,58 +1,157 @@
-from flask import request, jsonify
+from flask import request, jsonify, send_from_directory
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm import load_only
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
 from extensions import db
-from models import Solicitacao, Categoria, Bairro, User
+from models import Solicitacao, Apoio
+from pagination import keyset_page
+from ranking import rollup_snapshot, update_rollup
+from search import search_backend
+from reference_data import reference_data
+from identity import current_identity
+from changes import record_change
+from http_cache import data_version, not_modified, cacheable
+from geo import parse_bbox, parse_near, filter_bbox, filter_radius, zoom_precision
+from uploads import IMAGE_EXTENSIONS, UPLOAD_NAME, store_upload, photo_variants
+from jobs import enqueue
+from similarity import text_signature
+from duplicates import find_duplicate, add_apoio
 from datetime import datetime
-import json
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+def filter_solicitacoes(query, args):
+    categoria = args.get('categoria')
+    bairro = args.get('bairro')
+    status = args.get('status')
+    search = args.get('search')
+    vereador_id = args.get('vereador_id')
+    bbox = args.get('bbox')
+    near = args.get('near')
+    
+    if categoria:
+        categoria_id = reference_data.categoria_id(categoria)
+        if categoria_id:
+            query = query.filter_by(categoria_id=categoria_id)
+    
+    if bairro:
+        bairro_id = reference_data.bairro_id(bairro)
+        if bairro_id:
+            query = query.filter_by(bairro_id=bairro_id)
+    
+    if status:
+        query = query.filter_by(status=status)
+    
+    if vereador_id:
+        query = query.filter_by(vereador_id=vereador_id)
+    
+    if search:
+        query = search_backend().filter(query, search)
+    
+    if bbox:
+        query = filter_bbox(query, Solicitacao, *parse_bbox(bbox))
+    
+    if near:
+        radius = args.get('radius', 500, type=float)
+        if not math.isfinite(radius) or radius <= 0:
+            raise ValueError('radius must be a positive number')
+        query = filter_radius(query, Solicitacao, *parse_near(near), radius)
+    
+    return query
 
 def register_solicitacao_routes(app):
     @app.route('/api/solicitacoes', methods=['GET'])
     def get_solicitacoes():
         try:
             
-            categoria = request.args.get('categoria')
-            bairro = request.args.get('bairro')
-            status = request.args.get('status')
             search = request.args.get('search')
-            vereador_id = request.args.get('vereador_id')
+            ordem = request.args.get('ordem', 'recentes')  # recentes, relevancia
+            cursor = request.args.get('cursor')
+            fields = request.args.get('fields')
+            include_total = request.args.get('include_total', 'true').lower() != 'false'
             
-           
-            query = Solicitacao.query
+            page_size = request.args.get('page_size', app.config['SOLICITACOES_PAGE_SIZE'], type=int)
+            page_size = max(1, min(page_size, app.config['SOLICITACOES_MAX_PAGE_SIZE']))
             
-           
-            if categoria:
-                categoria_obj = Categoria.query.filter_by(nome=categoria).first()
-                if categoria_obj:
-                    query = query.filter_by(categoria_id=categoria_obj.id)
-            
-            if bairro:
-                bairro_obj = Bairro.query.filter_by(nome=bairro).first()
-                if bairro_obj:
-                    query = query.filter_by(bairro_id=bairro_obj.id)
-            
-            if status:
-                query = query.filter_by(status=status)
-            
-            if vereador_id:
-                query = query.filter_by(vereador_id=vereador_id)
-            
-            if search:
-                search_pattern = f'%{search}%'
-                query = query.filter(
-                    db.or_(
-                        Solicitacao.titulo.like(search_pattern),
-                        Solicitacao.descricao.like(search_pattern),
-                        Solicitacao.endereco.like(search_pattern)
-                    )
-                )
+            if fields:
+                fields = [field.strip() for field in fields.split(',') if field.strip()]
+                unknown = [field for field in fields if field not in Solicitacao.FIELD_COLUMNS]
+                if unknown:
+                    return jsonify({'error': f'Unknown fields: {", ".join(unknown)}'}), 400
+            
+            etag, last_modified = data_version()
+            unchanged = not_modified(etag, last_modified)
+            if unchanged:
+                return unchanged
+            
+            try:
+                query = filter_solicitacoes(Solicitacao.query, request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
            
-            solicitacoes = query.order_by(Solicitacao.created_at.desc()).all()
+            total = None
+            if include_total:
+                total = query.with_entities(db.func.count(Solicitacao.id)).order_by(None).scalar()
+            
+            if fields:
+                query = query.options(load_only(*Solicitacao.projection_columns(fields)))
+            query = query.options(*Solicitacao.eager_options(fields or None))
+            
+            if search and ordem == 'relevancia':
+                # Relevance order has no stable keyset, so it returns only the best page
+                solicitacoes = query.order_by(*search_backend().rank_order(search)).limit(page_size).all()
+                next_cursor = None
+            else:
+                try:
+                    solicitacoes, next_cursor = keyset_page(query, Solicitacao, page_size, cursor)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+            
+            return cacheable(jsonify({
+                'solicitacoes': Solicitacao.to_dict_many(solicitacoes, fields=fields or None),
+                'total': total,
+                'next_cursor': next_cursor
+            }), etag, last_modified), 200
             
-            return jsonify({
-                'solicitacoes': [sol.to_dict() for sol in solicitacoes],
-                'total': len(solicitacoes)
-            }), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/solicitacoes/clusters', methods=['GET'])
+    def get_solicitacao_clusters():
+        try:
+            zoom = request.args.get('zoom', 12, type=int)
+            etag, last_modified = data_version()
+            unchanged = not_modified(etag, last_modified)
+            if unchanged:
+                return unchanged
+            
+            try:
+                query = filter_solicitacoes(Solicitacao.query, request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            cell = db.func.substr(Solicitacao.geohash, 1, zoom_precision(zoom))
+            rows = query.filter(Solicitacao.geohash.isnot(None)).with_entities(
+                cell.label('geohash'),
+                db.func.count(Solicitacao.id),
+                db.func.avg(Solicitacao.latitude),
+                db.func.avg(Solicitacao.longitude)
+            ).group_by(cell).order_by(None).all()
+            
+            return cacheable(jsonify({
+                'zoom': zoom,
+                'clusters': [{
+                    'geohash': geohash,
+                    'count': count,
+                    'latitude': latitude,
+                    'longitude': longitude
+                } for geohash, count, latitude, longitude in rows]
+            }), etag, last_modified), 200
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -60,12 +159,44 @@ def register_solicitacao_routes(app):
     @app.route('/api/solicitacoes/<int:id>', methods=['GET'])
     def get_solicitacao(id):
         try:
-            solicitacao = Solicitacao.query.get(id)
+            # New apoios leave updated_at alone, so their count is part of the version
+            updated_at, total_apoios = db.session.query(
+                Solicitacao.updated_at, Solicitacao.total_apoios
+            ).filter_by(id=id).first() or (None, 0)
+            etag = f'{id}-{updated_at.timestamp() if updated_at else 0}-{total_apoios}'
+            unchanged = not_modified(etag, updated_at)
+            if unchanged:
+                return unchanged
+            
+            solicitacao = Solicitacao.query.options(
+                *Solicitacao.eager_options(include_user=True)
+            ).filter_by(id=id).first()
             
             if not solicitacao:
                 return jsonify({'error': 'Solicitação not found'}), 404
             
-            return jsonify({'solicitacao': solicitacao.to_dict(include_user=True)}), 200
+            return cacheable(jsonify({'solicitacao': solicitacao.to_dict(include_user=True)}), etag, updated_at), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+
+    @app.route('/api/solicitacoes/<int:id>/apoios', methods=['GET'])
+    def get_apoios(id):
+        try:
+            total_apoios = db.session.query(Solicitacao.total_apoios).filter_by(id=id).scalar()
+            if total_apoios is None:
+                return jsonify({'error': 'Solicitação not found'}), 404
+            # Apoios are only ever added, so the count versions the list
+            etag = f'apoios-{id}-{total_apoios}'
+            unchanged = not_modified(etag)
+            if unchanged:
+                return unchanged
+            
+            apoios = Apoio.query.filter_by(solicitacao_id=id).order_by(Apoio.id).all()
+            return cacheable(jsonify({
+                'apoios': [apoio.to_dict() for apoio in apoios],
+                'total': len(apoios)
+            }), etag), 200
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -76,13 +207,12 @@ def register_solicitacao_routes(app):
         try:
             try:
                 current_user_id = int(get_jwt_identity())
-                print(f"[Backend] Current user ID from JWT: {current_user_id}")
             except Exception as jwt_error:
-                print(f"[Backend] JWT decode error: {str(jwt_error)}")
+                logger.warning('JWT decode error', extra={'error': str(jwt_error)})
                 return jsonify({'error': 'Invalid or expired token. Please login again.'}), 401
             
             data = request.get_json()
-            print(f"[Backend] Received data: {json.dumps(data, indent=2)}")
+            logger.debug('Creating solicitação', extra={'user_id': current_user_id, 'payload': data})
             
           
             required_fields = ['titulo', 'categoria_id', 'descricao']
@@ -90,63 +220,101 @@ def register_solicitacao_routes(app):
                 if not data.get(field):
                     return jsonify({'error': f'{field} is required'}), 400
             
-           
+            try:
+                categoria_id = int(data['categoria_id'])
+            except (TypeError, ValueError):
+                return jsonify({'error': 'categoria_id must be an integer'}), 400
+            if not reference_data.has_categoria(categoria_id):
+                return jsonify({'error': f'Unknown categoria_id: {categoria_id}'}), 400
+            
+            # A report of an open problem close by becomes an apoio of it; forcar_nova skips the check
+            assinatura = text_signature(data['titulo'], data['descricao'])
+            if not data.get('forcar_nova'):
+                duplicada, similaridade = find_duplicate(
+                    categoria_id, data.get('latitude'), data.get('longitude'), assinatura,
+                    app.config['DEDUP_RADIUS_METERS'], app.config['DEDUP_WINDOW_DAYS'],
+                    app.config['DEDUP_SIMILARITY'], app.config['DEDUP_MAX_CANDIDATES']
+                )
+                if duplicada:
+                    apoio = add_apoio(duplicada, current_user_id, data, similaridade)
+                    if apoio is None:
+                        return jsonify({
+                            'error': 'You already filed or support a similar open solicitação',
+                            'duplicada': True,
+                            'similaridade': round(similaridade, 2),
+                            'solicitacao': duplicada.to_dict()
+                        }), 409
+                    db.session.commit()
+                    logger.info('Linked duplicate solicitação', extra={
+                        'solicitacao_id': duplicada.id, 'user_id': current_user_id, 'similaridade': similaridade
+                    })
+                    return jsonify({
+                        'message': 'Similar solicitação already open; added as apoio',
+                        'duplicada': True,
+                        'similaridade': round(similaridade, 2),
+                        'solicitacao': duplicada.to_dict(),
+                        'apoio': apoio.to_dict()
+                    }), 200
+            
             bairro_id = None
             if data.get('bairro'):
-                bairro = Bairro.query.filter_by(nome=data['bairro']).first()
-                if not bairro:
-                    bairro = Bairro(nome=data['bairro'])
-                    db.session.add(bairro)
-                    db.session.flush()
-                bairro_id = bairro.id
+                bairro_id = reference_data.get_or_create_bairro_id(data['bairro'])
             
            
             new_solicitacao = Solicitacao(
                 titulo=data['titulo'],
-                categoria_id=data['categoria_id'],
+                categoria_id=categoria_id,
                 descricao=data['descricao'],
                 endereco=data.get('endereco'),
                 bairro_id=bairro_id,
                 cep=data.get('cep'),
                 latitude=data.get('latitude'),
                 longitude=data.get('longitude'),
-                fotos=json.dumps(data.get('fotos', [])),
+                fotos=data.get('fotos', []),
+                assinatura=assinatura,
                 anonimo=data.get('anonimo', False),
                 user_id=current_user_id,
                 status='aberta'
             )
             
             db.session.add(new_solicitacao)
+            db.session.flush()
+            update_rollup(None, rollup_snapshot(new_solicitacao))
+            record_change(new_solicitacao, 'criada')
             db.session.commit()
             
-            print(f"[Backend] Successfully created solicitação ID: {new_solicitacao.id}")
+            logger.info('Created solicitação', extra={'solicitacao_id': new_solicitacao.id, 'user_id': current_user_id})
             
             return jsonify({
                 'message': 'Solicitação created successfully',
+                'duplicada': False,
                 'solicitacao': new_solicitacao.to_dict()
             }), 201
             
         except Exception as e:
             db.session.rollback()
-            print(f"[Backend] Error creating solicitação: {str(e)}")
+            logger.exception('Error creating solicitação')
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/solicitacoes/<int:id>', methods=['PUT'])
     @jwt_required()
     def update_solicitacao(id):
         try:
-            current_user_id = int(get_jwt_identity())
-            solicitacao = Solicitacao.query.get(id)
+            identity = current_identity()
+            if not identity:
+                return jsonify({'error': 'User not found'}), 404
+            
+            solicitacao = db.session.get(Solicitacao, id)
             
             if not solicitacao:
                 return jsonify({'error': 'Solicitação not found'}), 404
             
           
-            user = User.query.get(current_user_id)
-            if user.tipo_usuario != 'vereador' and solicitacao.user_id != current_user_id:
+            if identity['tipo_usuario'] != 'vereador' and solicitacao.user_id != identity['user_id']:
                 return jsonify({'error': 'Unauthorized'}), 403
             
             data = request.get_json()
+            rollup_before = rollup_snapshot(solicitacao)
             
           
             if 'status' in data:
@@ -164,6 +332,11 @@ def register_solicitacao_routes(app):
                 solicitacao.descricao = data['descricao']
             
             solicitacao.updated_at = datetime.utcnow()
+            # Not queued: the rollup, counter and analytics deltas (the latter two from mapper
+            # events) and the change-feed row must commit with the edit or not at all. A retried
+            # job would apply a delta twice, and the feed would order the edit wrongly
+            update_rollup(rollup_before, rollup_snapshot(solicitacao))
+            record_change(solicitacao, 'atualizada')
             
             db.session.commit()
             
@@ -180,14 +353,20 @@ def register_solicitacao_routes(app):
     def get_recent_solicitacoes():
         try:
             limit = request.args.get('limit', 10, type=int)
-            
-            solicitacoes = Solicitacao.query.order_by(
+            etag, last_modified = data_version()
+            unchanged = not_modified(etag, last_modified)
+            if unchanged:
+                return unchanged
+            
+            solicitacoes = Solicitacao.query.options(
+                *Solicitacao.eager_options()
+            ).order_by(
                 Solicitacao.created_at.desc()
             ).limit(limit).all()
             
-            return jsonify({
-                'solicitacoes': [sol.to_dict() for sol in solicitacoes]
-            }), 200
+            return cacheable(jsonify({
+                'solicitacoes': Solicitacao.to_dict_many(solicitacoes)
+            }), etag, last_modified), 200
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -195,20 +374,24 @@ def register_solicitacao_routes(app):
     @app.route('/api/categorias', methods=['GET'])
     def get_categorias():
         try:
-            categorias = Categoria.query.all()
-            return jsonify({
-                'categorias': [cat.to_dict() for cat in categorias]
-            }), 200
+            categorias, etag = reference_data.rows('categorias')
+            response = jsonify({
+                'categorias': categorias
+            })
+            response.set_etag(etag)
+            return response.make_conditional(request)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
     @app.route('/api/bairros', methods=['GET'])
     def get_bairros():
         try:
-            bairros = Bairro.query.all()
-            return jsonify({
-                'bairros': [bairro.to_dict() for bairro in bairros]
-            }), 200
+            bairros, etag = reference_data.rows('bairros')
+            response = jsonify({
+                'bairros': bairros
+            })
+            response.set_etag(etag)
+            return response.make_conditional(request)
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -224,21 +407,52 @@ def register_solicitacao_routes(app):
             if file.filename == '':
                 return jsonify({'error': 'No file selected'}), 400
             
-       
-            import os
-            from werkzeug.utils import secure_filename
-            
-            filename = secure_filename(file.filename)
-            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename}"
+            extension = os.path.splitext(secure_filename(file.filename))[1].lstrip('.').lower()
+            if extension not in IMAGE_EXTENSIONS:
+                return jsonify({'error': f'Unsupported file type: {extension or "unknown"}'}), 400
             
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            folder = os.path.abspath(app.config['UPLOAD_FOLDER'])
+            digest, filename, is_new = store_upload(file.stream, folder, extension)
+            if is_new:
+                # Resized copies are made by a job worker; originals are served until they exist
+                enqueue('photo_variants', {'digest': digest, 'filename': filename}, idempotency_key=f'photo_variants:{digest}')
+                db.session.commit()
             
+            url = f'/uploads/{filename}'
             return jsonify({
                 'message': 'File uploaded successfully',
-                'url': f'/uploads/{filename}'
+                'url': url,
+                'variants': photo_variants(url)
             }), 200
             
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'File too large'}), 413
         except Exception as e:
+            db.session.rollback()
             return jsonify({'error': str(e)}), 500
+
+    @app.route('/uploads/<path:filename>', methods=['GET'])
+    def get_upload(filename):
+        folder = os.path.abspath(app.config['UPLOAD_FOLDER'])
+        match = UPLOAD_NAME.match(filename)
+        if not match:
+            # Uploads from before content addressing (<timestamp>_<name>): served as they are
+            if filename != secure_filename(filename):
+                return jsonify({'error': 'File not found'}), 404
+            return send_from_directory(folder, filename)
+        if not os.path.exists(os.path.join(folder, filename)):
+            # Variant still being generated: serve the original meanwhile
+            digest = match.group(1)
+            originals = [
+                f'{digest}.{extension}' for extension in sorted(IMAGE_EXTENSIONS)
+                if os.path.exists(os.path.join(folder, f'{digest}.{extension}'))
+            ]
+            if not originals:
+                return jsonify({'error': 'File not found'}), 404
+            response = send_from_directory(folder, originals[0])
+            # Not cacheable: the URL must show the resized file once the job has written it
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        response = send_from_directory(folder, filename, max_age=31536000)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+from flask_migrate import upgrade
+
+# The backend modules import each other by plain name, as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from models import User, Vereador, Categoria  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(tmp_path, "test.db")}',
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'PASSWORD_HASH_WORKERS': 0
+    })
+    with app.app_context():
+        upgrade()
+        db.session.add_all([Categoria(nome='Pavimentação'), Categoria(nome='Iluminação')])
+        citizen = User(email='cidadao@email.com', password_hash='-', nome='Cidadão')
+        vereador_user = User(email='vereador@email.com', password_hash='-', nome='Vereadora', tipo_usuario='vereador')
+        db.session.add_all([citizen, vereador_user])
+        db.session.flush()
+        db.session.add(Vereador(user_id=vereador_user.id, nome='Vereadora', partido='PV'))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
@@ -0,0 +1,69 @@
+"""The list endpoints must run a fixed number of SQL statements, however many rows they return."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Bairro, Solicitacao
+
+LIST_URLS = [
+    '/api/solicitacoes',
+    '/api/solicitacoes/recent?limit=50',
+    '/api/vereadores/1/solicitacoes',
+    '/api/vereadores'
+]
+
+
+def add_solicitacoes(count):
+    # A bairro per row, so a lazy load per row can't be served from the identity map
+    start = db.session.query(db.func.count(Bairro.id)).scalar()
+    db.session.execute(db.insert(Bairro), [{'nome': f'Bairro {start + n}'} for n in range(count)])
+    bairro_ids = [id for id, in db.session.query(Bairro.id).order_by(Bairro.id.desc()).limit(count)]
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Solicitacao), [{
+        'titulo': f'Solicitação {n}',
+        'descricao': 'Descrição',
+        'categoria_id': 1 + n % 2,
+        'bairro_id': bairro_ids[n],
+        'user_id': 1,
+        'vereador_id': 1 if n % 2 else None,
+        'status': 'em_andamento' if n % 2 else 'aberta',
+        'created_at': now - timedelta(minutes=n),
+        'updated_at': now - timedelta(minutes=n)
+    } for n in range(count)])
+    db.session.commit()
+
+
+def count_statements(app, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements)
+
+
+@pytest.mark.parametrize('url', LIST_URLS)
+def test_query_count_does_not_grow_with_rows(app, url):
+    with app.app_context():
+        add_solicitacoes(4)
+    # First request fills the process caches (reference data, identities, stats)
+    count_statements(app, url)
+    few = count_statements(app, url)
+
+    with app.app_context():
+        add_solicitacoes(40)
+    count_statements(app, url)
+    many = count_statements(app, url)
+
+    assert many == few
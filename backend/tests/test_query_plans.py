@@ -0,0 +1,48 @@
+"""The read endpoints in query_plans.CHECKED_URLS must not fall back to full table scans."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from models import Apoio, Bairro, Solicitacao
+from query_plans import CHECKED_URLS, full_scans
+from ranking import rebuild_rollups
+
+
+@pytest.fixture
+def seeded_app(app):
+    with app.app_context():
+        centro = Bairro(nome='Centro')
+        db.session.add(centro)
+        db.session.flush()
+        now = datetime.utcnow()
+        for n in range(20):
+            resolvida = n % 4 == 3
+            db.session.add(Solicitacao(
+                titulo=f'Iluminação apagada {n}',
+                descricao='Poste sem luz na esquina',
+                categoria_id=1 + n % 2,
+                bairro_id=centro.id if n % 2 else None,
+                latitude=-23.55 + n * 0.001,
+                longitude=-46.63 - n * 0.001,
+                status='resolvida' if resolvida else ('em_andamento' if n % 2 else 'aberta'),
+                tempo_resolucao=n if resolvida else None,
+                user_id=1,
+                vereador_id=1 if n % 2 else None,
+                created_at=now - timedelta(days=n),
+                updated_at=now - timedelta(days=n)
+            ))
+        db.session.flush()
+        db.session.add(Apoio(solicitacao_id=1, user_id=2, titulo='Apoio', descricao='Mesmo poste', similaridade=0.9))
+        db.session.commit()
+        rebuild_rollups()
+    return app
+
+
+@pytest.mark.parametrize('url', CHECKED_URLS)
+def test_read_endpoint_uses_indexes(seeded_app, url):
+    # A failing request would run no SQL and pass the plan check below
+    response = seeded_app.test_client().get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+
+    assert full_scans(seeded_app, url) == []
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import re
+import tempfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional, without it only originals are served
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'webp'}
+# Variant name -> longest side in pixels
+VARIANTS = {
+    'thumb': 320,
+    'medium': 1024
+}
+CONTENT_URL = re.compile(r'^/uploads/([0-9a-f]{64})\.\w+$')
+# An original (<sha256>.<ext>) or one of its variants (<sha256>_<variant>.jpg) under /uploads
+UPLOAD_NAME = re.compile(
+    rf"^([0-9a-f]{{64}})(?:_(?:{'|'.join(VARIANTS)}))?\.(?:{'|'.join(sorted(IMAGE_EXTENSIONS))})$"
+)
+
+def variant_filename(digest, variant):
+    return f'{digest}_{variant}.jpg'
+
+
+def photo_variants(url):
+    """URLs of the resized copies of a content-addressed upload, or None for other URLs."""
+    match = CONTENT_URL.match(url or '')
+    if not match:
+        return None
+    return {variant: f'/uploads/{variant_filename(match.group(1), variant)}' for variant in VARIANTS}
+
+
+def store_upload(stream, folder, extension):
+    """Copy `stream` to disk in chunks, named by its SHA-256. Returns (digest, filename, is_new)."""
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        filename = f'{hexdigest}.{extension}'
+        path = os.path.join(folder, filename)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return hexdigest, filename, False
+        os.replace(tmp_path, path)
+        return hexdigest, filename, True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def generate_variants(folder, digest, filename):
+    """Write the resized copies of an upload; runs as the photo_variants background job."""
+    if Image is None:
+        return
+    with Image.open(os.path.join(folder, filename)) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for variant, size in VARIANTS.items():
+            target = os.path.join(folder, variant_filename(digest, variant))
+            if os.path.exists(target):
+                continue
+            resized = image.copy()
+            resized.thumbnail((size, size))
+            tmp_path = f'{target}.part'
+            resized.save(tmp_path, 'JPEG', quality=82, optimize=True)
+            os.replace(tmp_path, target)
+
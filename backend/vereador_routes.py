@@ -1,29 +1,40 @@
+import click
 from flask import request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from models import Vereador, Solicitacao, User
+from ranking import vereador_ranking, reconcile_counters, rebuild_rollups, RANKING_WINDOWS
+from cache import TTLCache, clear_on_commit
+from http_cache import data_version, not_modified, cacheable
+from datetime import datetime
 
 def register_vereador_routes(app):
+    stats_cache = TTLCache(app.config['STATS_CACHE_TTL'])
+    clear_on_commit(stats_cache, Solicitacao)
+    
     @app.route('/api/vereadores', methods=['GET'])
     def get_vereadores():
         try:
        
             ranking = request.args.get('ranking', 'geral')  # geral, semestre, mes
             
-            vereadores = Vereador.query.all()
-            vereadores_data = []
+            if ranking not in RANKING_WINDOWS:
+                return jsonify({'error': f'Invalid ranking: {ranking}'}), 400
             
-            for vereador in vereadores:
-                vereador_dict = vereador.to_dict(include_stats=True)
-                vereadores_data.append(vereador_dict)
+            etag, last_modified = data_version()
+            if RANKING_WINDOWS[ranking]:
+                # Windowed rankings also move when the window slides past midnight
+                etag = f'{etag}-{datetime.utcnow().date().isoformat()}'
+            unchanged = not_modified(etag, last_modified)
+            if unchanged:
+                return unchanged
             
+            vereadores_data = vereador_ranking(ranking=ranking)
             
-            vereadores_data.sort(key=lambda x: x.get('taxa_resolucao', 0), reverse=True)
-            
-            return jsonify({
+            return cacheable(jsonify({
                 'vereadores': vereadores_data,
                 'total': len(vereadores_data)
-            }), 200
+            }), etag, last_modified), 200
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -31,14 +42,19 @@ def register_vereador_routes(app):
     @app.route('/api/vereadores/<int:id>', methods=['GET'])
     def get_vereador(id):
         try:
-            vereador = Vereador.query.get(id)
+            etag, last_modified = data_version()
+            unchanged = not_modified(etag, last_modified)
+            if unchanged:
+                return unchanged
             
-            if not vereador:
+            vereadores_data = vereador_ranking(vereador_id=id)
+            
+            if not vereadores_data:
                 return jsonify({'error': 'Vereador not found'}), 404
             
-            return jsonify({
-                'vereador': vereador.to_dict(include_stats=True)
-            }), 200
+            return cacheable(jsonify({
+                'vereador': vereadores_data[0]
+            }), etag, last_modified), 200
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -46,6 +62,11 @@ def register_vereador_routes(app):
     @app.route('/api/vereadores/<int:id>/solicitacoes', methods=['GET'])
     def get_vereador_solicitacoes(id):
         try:
+            etag, last_modified = data_version()
+            unchanged = not_modified(etag, last_modified)
+            if unchanged:
+                return unchanged
+            
             vereador = Vereador.query.get(id)
             
             if not vereador:
@@ -54,17 +75,19 @@ def register_vereador_routes(app):
           
             status = request.args.get('status')
             
-            query = Solicitacao.query.filter_by(vereador_id=id)
+            query = Solicitacao.query.options(
+                *Solicitacao.eager_options()
+            ).filter_by(vereador_id=id)
             
             if status:
                 query = query.filter_by(status=status)
             
             solicitacoes = query.order_by(Solicitacao.created_at.desc()).all()
             
-            return jsonify({
-                'solicitacoes': [sol.to_dict() for sol in solicitacoes],
+            return cacheable(jsonify({
+                'solicitacoes': Solicitacao.to_dict_many(solicitacoes),
                 'total': len(solicitacoes)
-            }), 200
+            }), etag, last_modified), 200
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
@@ -72,47 +95,69 @@ def register_vereador_routes(app):
     @app.route('/api/vereadores/stats', methods=['GET'])
     def get_vereadores_stats():
         try:
-            
-            total_solicitacoes = Solicitacao.query.filter(Solicitacao.vereador_id.isnot(None)).count()
-            total_resolvidas = Solicitacao.query.filter(
-                Solicitacao.status == 'resolvida',
-                Solicitacao.vereador_id.isnot(None)
-            ).count()
-            total_abertas = Solicitacao.query.filter(
-                Solicitacao.status == 'aberta',
+            cached = stats_cache.get('stats')
+            if cached:
+                data, age = cached
+                response = jsonify(data)
+                response.headers['X-Cache'] = 'HIT'
+                response.headers['Age'] = str(int(age))
+                return response, 200
+            
+            resolvida = Solicitacao.status == 'resolvida'
+            
+            def total(condition):
+                return db.cast(db.func.sum(db.case((condition, 1), else_=0)), db.Integer)
+            
+            # Cast so Postgres doesn't hand back Decimal, which would be serialized as a string
+            totals = db.session.query(
+                db.func.count(Solicitacao.id).label('total'),
+                total(resolvida).label('resolvidas'),
+                total(Solicitacao.status == 'aberta').label('abertas'),
+                total(Solicitacao.status == 'em_andamento').label('em_andamento'),
+                db.cast(db.func.avg(db.case(
+                    (db.and_(resolvida, Solicitacao.tempo_resolucao.isnot(None)), Solicitacao.tempo_resolucao)
+                )), db.Float).label('tempo_medio'),
+                db.func.count(db.distinct(Solicitacao.user_id)).label('cidadaos')
+            ).filter(
                 Solicitacao.vereador_id.isnot(None)
-            ).count()
-            total_em_andamento = Solicitacao.query.filter(
-                Solicitacao.status == 'em_andamento',
-                Solicitacao.vereador_id.isnot(None)
-            ).count()
+            ).one()
             
+            total_solicitacoes = totals.total
+            total_resolvidas = totals.resolvidas or 0
+            tempo_medio_geral = totals.tempo_medio or 0
             
-            resolvidas = Solicitacao.query.filter(
-                Solicitacao.status == 'resolvida',
-                Solicitacao.tempo_resolucao.isnot(None),
-                Solicitacao.vereador_id.isnot(None)
-            ).all()
-            
-            tempo_medio_geral = sum([s.tempo_resolucao for s in resolvidas]) / len(resolvidas) if resolvidas else 0
-            
-            
-            cidadaos_engajados = db.session.query(Solicitacao.user_id).filter(
-                Solicitacao.vereador_id.isnot(None)
-            ).distinct().count()
-            
-            return jsonify({
+            data = {
                 'total_solicitacoes': total_solicitacoes,
                 'solicitacoes_resolvidas': total_resolvidas,
                 'tempo_medio_resolucao': round(tempo_medio_geral, 1),
                 'taxa_resolucao': round((total_resolvidas / total_solicitacoes * 100) if total_solicitacoes > 0 else 0, 0),
-                'cidadaos_atendidos': cidadaos_engajados,
+                'cidadaos_atendidos': totals.cidadaos,
                 'status_breakdown': {
-                    'aberta': total_abertas,
-                    'em_andamento': total_em_andamento,
+                    'aberta': totals.abertas or 0,
+                    'em_andamento': totals.em_andamento or 0,
                     'resolvida': total_resolvidas
                 }
-            }), 200
+            }
+            stats_cache.set('stats', data)
+            
+            response = jsonify(data)
+            response.headers['X-Cache'] = 'MISS'
+            response.headers['Age'] = '0'
+            return response, 200
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
+
+    @app.cli.command('reconcile-vereador-counters')
+    @click.option('--dry-run', is_flag=True, help='Only report drift, leave the counters as they are.')
+    def reconcile_vereador_counters_command(dry_run):
+        """Rebuild the denormalized vereador counters from solicitacoes and report drift."""
+        drift = reconcile_counters(fix=not dry_run)
+        for vereador_id, (stored, actual) in drift.items():
+            click.echo(f'vereador {vereador_id}: stored {stored}, actual {actual}')
+        click.echo(f"{len(drift)} vereador(es) with drift{'' if dry_run else ' fixed'}")
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """Recompute the daily rollups behind the semestre/mes rankings from solicitacoes."""
+        click.echo(f'{rebuild_rollups()} rollup bucket(s) rebuilt')
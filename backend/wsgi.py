@@ -0,0 +1,3 @@
+# Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+# Reuses the app built on import of app.py; a second create_app() would register every listener twice
+from app import app
@@ -1,3 +1,5 @@
+import { readHeaders, trackWrite } from "./read-your-writes"
+
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:5000"
 
 export interface Solicitacao {
@@ -13,6 +15,7 @@ export interface Solicitacao {
   latitude?: number
   longitude?: number
   fotos: string[]
+  fotos_miniaturas?: string[]
   status: "aberta" | "em_andamento" | "resolvida"
   anonimo: boolean
   vereador_id?: number
@@ -20,6 +23,20 @@ export interface Solicitacao {
   created_at: string
   updated_at: string
   tempo_resolucao?: number
+  apoios: number
+}
+
+// A report merged into an open solicitação as support, see createSolicitacao
+export interface Apoio {
+  id: number
+  solicitacao_id: number
+  titulo: string
+  descricao: string
+  latitude?: number
+  longitude?: number
+  fotos: string[]
+  similaridade: number
+  created_at: string
 }
 
 export interface Vereador {
@@ -74,25 +91,79 @@ export async function getSolicitacoes(filters?: {
   status?: string
   search?: string
   vereador_id?: number
-}): Promise<{ solicitacoes: Solicitacao[]; total: number }> {
+  cursor?: string
+  page_size?: number
+  include_total?: boolean
+  fields?: string[]
+  bbox?: [number, number, number, number]
+  near?: { latitude: number; longitude: number; radius?: number }
+}): Promise<{ solicitacoes: Solicitacao[]; total: number; next_cursor: string | null }> {
   const params = new URLSearchParams()
   if (filters?.categoria) params.append("categoria", filters.categoria)
   if (filters?.bairro) params.append("bairro", filters.bairro)
   if (filters?.status) params.append("status", filters.status)
   if (filters?.search) params.append("search", filters.search)
   if (filters?.vereador_id) params.append("vereador_id", filters.vereador_id.toString())
+  if (filters?.cursor) params.append("cursor", filters.cursor)
+  if (filters?.page_size) params.append("page_size", filters.page_size.toString())
+  if (filters?.include_total === false) params.append("include_total", "false")
+  if (filters?.fields?.length) params.append("fields", filters.fields.join(","))
+  if (filters?.bbox) params.append("bbox", filters.bbox.join(","))
+  if (filters?.near) {
+    params.append("near", `${filters.near.latitude},${filters.near.longitude}`)
+    if (filters.near.radius) params.append("radius", filters.near.radius.toString())
+  }
 
-  const response = await fetch(`${API_BASE_URL}/api/solicitacoes?${params.toString()}`)
+  const response = await fetch(`${API_BASE_URL}/api/solicitacoes?${params.toString()}`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch solicitações")
   return response.json()
 }
 
+// The list endpoint returns one page (50 rows by default); this follows next_cursor to the end
+export async function getAllSolicitacoes(
+  filters?: Omit<NonNullable<Parameters<typeof getSolicitacoes>[0]>, "cursor" | "page_size" | "include_total">,
+): Promise<Solicitacao[]> {
+  const solicitacoes: Solicitacao[] = []
+  let cursor: string | undefined
+  do {
+    const page = await getSolicitacoes({ ...filters, cursor, page_size: 200, include_total: false })
+    solicitacoes.push(...page.solicitacoes)
+    cursor = page.next_cursor ?? undefined
+  } while (cursor)
+  return solicitacoes
+}
+
+export interface SolicitacaoCluster {
+  geohash: string
+  count: number
+  latitude: number
+  longitude: number
+}
+
+export async function getSolicitacaoClusters(
+  zoom: number,
+  bbox?: [number, number, number, number],
+): Promise<{ zoom: number; clusters: SolicitacaoCluster[] }> {
+  const params = new URLSearchParams({ zoom: zoom.toString() })
+  if (bbox) params.append("bbox", bbox.join(","))
+
+  const response = await fetch(`${API_BASE_URL}/api/solicitacoes/clusters?${params.toString()}`, { headers: readHeaders() })
+  if (!response.ok) throw new Error("Failed to fetch clusters")
+  return response.json()
+}
+
 export async function getSolicitacao(id: number): Promise<{ solicitacao: Solicitacao }> {
-  const response = await fetch(`${API_BASE_URL}/api/solicitacoes/${id}`)
+  const response = await fetch(`${API_BASE_URL}/api/solicitacoes/${id}`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch solicitação")
   return response.json()
 }
 
+export async function getApoios(id: number): Promise<{ apoios: Apoio[]; total: number }> {
+  const response = await fetch(`${API_BASE_URL}/api/solicitacoes/${id}/apoios`, { headers: readHeaders() })
+  if (!response.ok) throw new Error("Failed to fetch apoios")
+  return response.json()
+}
+
 export async function createSolicitacao(data: {
   titulo: string
   categoria_id: number
@@ -104,7 +175,15 @@ export async function createSolicitacao(data: {
   longitude?: number
   fotos?: string[]
   anonimo?: boolean
-}): Promise<{ message: string; solicitacao: Solicitacao }> {
+  forcar_nova?: boolean
+}): Promise<{
+  message: string
+  solicitacao: Solicitacao
+  // true when an open solicitação nearby already covers it; the report was added as an apoio
+  duplicada: boolean
+  similaridade?: number
+  apoio?: Apoio
+}> {
   const token = getAuthToken()
 
   if (!token) throw new Error("Authentication required")
@@ -115,6 +194,7 @@ export async function createSolicitacao(data: {
       headers: getAuthHeaders(),
       body: JSON.stringify(data),
     })
+    trackWrite(response)
 
     const responseText = await response.text()
 
@@ -157,6 +237,7 @@ export async function updateSolicitacao(
     headers: getAuthHeaders(),
     body: JSON.stringify(data),
   })
+  trackWrite(response)
 
   if (!response.ok) {
     const error = await response.json()
@@ -167,19 +248,59 @@ export async function updateSolicitacao(
 }
 
 export async function getRecentSolicitacoes(limit = 10): Promise<{ solicitacoes: Solicitacao[] }> {
-  const response = await fetch(`${API_BASE_URL}/api/solicitacoes/recent?limit=${limit}`)
+  const response = await fetch(`${API_BASE_URL}/api/solicitacoes/recent?limit=${limit}`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch recent solicitações")
   return response.json()
 }
 
-export async function getVereadores(): Promise<{ vereadores: Vereador[]; total: number }> {
-  const response = await fetch(`${API_BASE_URL}/api/vereadores`)
+export interface SolicitacaoChange {
+  id: number
+  solicitacao_id: number
+  acao: "criada" | "atualizada" | "apoiada"
+  status: string
+  created_at: string
+}
+
+export async function getSolicitacaoChanges(
+  since?: number,
+  solicitacao_id?: number,
+): Promise<{ changes: SolicitacaoChange[]; solicitacoes: Solicitacao[]; last_id: number; has_more: boolean }> {
+  const params = new URLSearchParams()
+  if (since !== undefined) params.append("since", since.toString())
+  if (solicitacao_id) params.append("solicitacao_id", solicitacao_id.toString())
+
+  const response = await fetch(`${API_BASE_URL}/api/solicitacoes/changes?${params.toString()}`, { headers: readHeaders() })
+  if (!response.ok) throw new Error("Failed to fetch changes")
+  return response.json()
+}
+
+// Live updates over server-sent events; the browser resumes from the last event id on reconnect
+export function subscribeToSolicitacaoChanges(
+  onChange: (change: SolicitacaoChange, solicitacao: Solicitacao | null) => void,
+  options?: { since?: number; solicitacao_id?: number },
+): () => void {
+  const params = new URLSearchParams()
+  if (options?.since !== undefined) params.append("since", options.since.toString())
+  if (options?.solicitacao_id) params.append("solicitacao_id", options.solicitacao_id.toString())
+
+  const source = new EventSource(`${API_BASE_URL}/api/solicitacoes/changes/stream?${params.toString()}`)
+  source.addEventListener("change", (event) => {
+    const { change, solicitacao } = JSON.parse((event as MessageEvent).data)
+    onChange(change, solicitacao)
+  })
+  return () => source.close()
+}
+
+export async function getVereadores(
+  ranking: "geral" | "semestre" | "mes" = "geral",
+): Promise<{ vereadores: Vereador[]; total: number }> {
+  const response = await fetch(`${API_BASE_URL}/api/vereadores?ranking=${ranking}`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch vereadores")
   return response.json()
 }
 
 export async function getVereador(id: number): Promise<{ vereador: Vereador }> {
-  const response = await fetch(`${API_BASE_URL}/api/vereadores/${id}`)
+  const response = await fetch(`${API_BASE_URL}/api/vereadores/${id}`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch vereador")
   return response.json()
 }
@@ -191,7 +312,7 @@ export async function getVereadorSolicitacoes(
   const params = new URLSearchParams()
   if (status) params.append("status", status)
 
-  const response = await fetch(`${API_BASE_URL}/api/vereadores/${id}/solicitacoes?${params.toString()}`)
+  const response = await fetch(`${API_BASE_URL}/api/vereadores/${id}/solicitacoes?${params.toString()}`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch vereador solicitações")
   return response.json()
 }
@@ -204,19 +325,73 @@ export async function getVereadoresStats(): Promise<{
   cidadaos_atendidos: number
   status_breakdown: { aberta: number; em_andamento: number; resolvida: number }
 }> {
-  const response = await fetch(`${API_BASE_URL}/api/vereadores/stats`)
+  const response = await fetch(`${API_BASE_URL}/api/vereadores/stats`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch stats")
   return response.json()
 }
 
 export async function getCategorias(): Promise<{ categorias: Categoria[] }> {
-  const response = await fetch(`${API_BASE_URL}/api/categorias`)
+  const response = await fetch(`${API_BASE_URL}/api/categorias`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch categorias")
   return response.json()
 }
 
 export async function getBairros(): Promise<{ bairros: Bairro[] }> {
-  const response = await fetch(`${API_BASE_URL}/api/bairros`)
+  const response = await fetch(`${API_BASE_URL}/api/bairros`, { headers: readHeaders() })
   if (!response.ok) throw new Error("Failed to fetch bairros")
   return response.json()
 }
+
+export interface AnalyticsPoint {
+  periodo: string
+  abertas: number
+  resolvidas: number
+  tempo_medio: number | null
+  tempo_p50: number | null
+  tempo_p90: number | null
+}
+
+export interface AnalyticsSeries {
+  bairro_id?: number | null
+  bairro?: string | null
+  categoria_id?: number
+  categoria?: string
+  pontos: AnalyticsPoint[]
+}
+
+export async function getAnalyticsTimeseries(options?: {
+  interval?: "dia" | "semana" | "mes"
+  group_by?: Array<"bairro" | "categoria">
+  from?: string
+  to?: string
+  bairro?: string
+  categoria?: string
+}): Promise<{ interval: string; from: string; to: string; group_by: string[]; series: AnalyticsSeries[] }> {
+  const params = new URLSearchParams()
+  if (options?.interval) params.append("interval", options.interval)
+  if (options?.group_by?.length) params.append("group_by", options.group_by.join(","))
+  if (options?.from) params.append("from", options.from)
+  if (options?.to) params.append("to", options.to)
+  if (options?.bairro) params.append("bairro", options.bairro)
+  if (options?.categoria) params.append("categoria", options.categoria)
+
+  const response = await fetch(`${API_BASE_URL}/api/analytics/timeseries?${params.toString()}`, { headers: readHeaders() })
+  if (!response.ok) throw new Error("Failed to fetch analytics")
+  return response.json()
+}
+
+export interface SnapshotManifest {
+  snapshot: string
+  generated_at: string
+  linhas: number
+  formato: "parquet"
+  schema: Array<{ nome: string; tipo: string }>
+  arquivos: Array<{ mes: string; arquivo: string; linhas: number; bytes: number; url: string }>
+}
+
+// Open-data snapshot: one Parquet file per month, downloaded straight from the file URLs
+export async function getSolicitacoesSnapshot(): Promise<SnapshotManifest> {
+  const response = await fetch(`${API_BASE_URL}/api/exports/solicitacoes`)
+  if (!response.ok) throw new Error("Failed to fetch snapshot")
+  return response.json()
+}
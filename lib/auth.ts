@@ -1,3 +1,5 @@
+import { readHeaders, trackWrite } from "./read-your-writes"
+
 export interface User {
   id: string
   name: string
@@ -48,6 +50,7 @@ export async function fetchWithAuth(url: string, options: RequestInit = {}) {
   const headers = {
     "Content-Type": "application/json",
     ...(token && { Authorization: `Bearer ${token}` }),
+    ...readHeaders(),
     ...options.headers,
   }
 
@@ -55,6 +58,7 @@ export async function fetchWithAuth(url: string, options: RequestInit = {}) {
     ...options,
     headers,
   })
+  trackWrite(response)
 
   if (response.status === 401) {
     logout()
@@ -110,6 +114,7 @@ export async function register(userData: {
     },
     body: JSON.stringify(userData),
   })
+  trackWrite(response)
 
   if (!response.ok) {
     const error = await response.json().catch(() => ({}))
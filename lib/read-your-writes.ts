@@ -0,0 +1,16 @@
+// After a write the backend answers with X-Primary-Until; until then our reads must go to the
+// primary database rather than a read replica that may not have the write yet (backend/replicas.py)
+const STORAGE_KEY = "primaryUntil"
+
+export function trackWrite(response: Response): void {
+  const until = Number(response.headers.get("X-Primary-Until"))
+  if (until && typeof window !== "undefined") {
+    sessionStorage.setItem(STORAGE_KEY, until.toString())
+  }
+}
+
+export function readHeaders(): Record<string, string> {
+  if (typeof window === "undefined") return {}
+  const until = Number(sessionStorage.getItem(STORAGE_KEY))
+  return until * 1000 > Date.now() ? { "X-Primary-Until": until.toString() } : {}
+}